@@ -6,6 +6,8 @@ import os
 import shutil
 import sys
 
+from load_balance import lptSchedule, printSchedule, trialCost
+
 """ INPUTS
 Name of new test directory
 """
@@ -71,7 +73,7 @@ def createDirectory(dirPath):
         os.mkdir(dirPath)
 
 
-def populateTests(params, problem_args, newTestDir, binary, slurm):
+def populateTests(params, problem_args, newTestDir, binary, slurms):
     """
     create a directory and sub directories in a given location
     calls modifyBeamBending and passes the subfolder file path so the json can we written
@@ -80,14 +82,14 @@ def populateTests(params, problem_args, newTestDir, binary, slurm):
     :param problem_args: numbers relevant to beam bending problem
     :param newTestDir: Name of the new generation of tests where all these files will be placed
     :param binary: Directory named with a binary (i.e. 00101). Represents a combination of parameters
-    :param slurm: filepath to the doit.slurm file
+    :param slurms: filepath to the doit.slurm file of each trial
     """
     # Create paths for new binary folder
     binaryPath = newTestDir + binary + "/"
     createDirectory(binaryPath)
 
     # subfolders names trial1, trial2 etc.Ya
-    for trialNumber in range(5):
+    for trialNumber, slurm in enumerate(slurms):
         trialPath = "{0}trial{1}".format(binaryPath, trialNumber)
         os.mkdir(trialPath)
         # write json to new trial folder
@@ -139,12 +141,20 @@ def main():
         newTestDir.append("{0}t{1}/".format(testSuperPath, points))
         createDirectory(newTestDir[-1])
 
+    # distribute the trials over the 3 nodes so that each gets the same estimated work
+    numberOfTrials = 5
+    tests = [(binary, n) for binary in binaries for n in range(len(problem_args))]
+    costs = [trialCost(*getParams(binary)[:2], training_points=problem_args[n][3])
+             for binary, n in tests for trialNumber in range(numberOfTrials)]
+    nodes, totals = lptSchedule(costs, len(slurmPaths))
+    labels = ["t{0}/{1}/trial{2}".format(problem_args[n][3], binary, trialNumber)
+              for binary, n in tests for trialNumber in range(numberOfTrials)]
+    printSchedule(labels, nodes, totals, [os.path.basename(path) for path in slurmPaths])
+
     # populate tests
-    for binary in binaries:
-        params = getParams(binary)
-        for n in range(len(problem_args)):  # places a binary folder in each training point directory
-            slurm = slurmPaths[n // 2]      # distrubute jobs evenly over 3 seperate nodes.
-            populateTests(params, problem_args[n], newTestDir[n], binary, slurm)
+    for i, (binary, n) in enumerate(tests):  # places a binary folder in each training point directory
+        slurms = [slurmPaths[node] for node in nodes[i * numberOfTrials:(i + 1) * numberOfTrials]]
+        populateTests(getParams(binary), problem_args[n], newTestDir[n], binary, slurms)
 
 
 if __name__ == "__main__":
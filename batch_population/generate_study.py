@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+Generates a study from a JSON study spec instead of nested loops over hard coded levels.
+
+    {"study": "tuning_params",
+     "root": "/uufs/chpc.utah.edu/common/home/u1008557/tuning_params/",
+     "factors": {"pop_size": [100, 300], "stack_size": [50, 100], "differential_weight": [0.1, 1.0],
+                 "crossover_rate": [0.4, 0.8], "mutation_rate": [0.4, 0.8]},
+     "design": {"type": "fractional", "p": 1},
+     "trials": 5,
+     "slurm": "/uufs/chpc.utah.edu/common/home/u1008557/models/fifth_deriv_penalty/doit.slurm",
+     "hours_per_trial": 2.0}
+
+Factors are hyperparams keys, or paths into the config such as "problem_args.3" (training points).
+"base" overrides keys of BASE_CONFIG for the whole study. The design is one of study_design.py.
+The job count and node-hours are printed first; directories are only created with --create.
+
+--compact keeps the metadata operations on NFS to a minimum: one config per design point in configs/,
+one link to the slurm script and a single manifest, trials.json, listing every (point, trial). The
+trial directories are only made when a trial starts, by prepareTrial. --array also writes a SLURM
+array script that runs every row of the manifest as one task (see slurm_array.py), settings of the
+array go in the "array" entry of the spec, i.e. {"throttle": 50, "partition": "notchpeak"}.
+
+    python generate_study.py <spec.json> [--create [--compact | --array [--throttle N]]]
+"""
+
+import argparse
+import copy
+import json
+import os
+import shutil
+
+from study_design import designPoints, designGenerators
+
+MANIFEST_NAME = "trials.json"
+CONFIG_DIR = "configs"
+
+# beam_bending.json every trial starts from
+BASE_CONFIG = {
+    "problem": "beam_bending",
+    "operators": ["+", "-", "*", "/", "^"],
+    "problem_args": [5.0e-2, 0.0, 10.0, 5],
+    "hyperparams": {
+        "pop_size": 500,
+        "stack_size": 120,
+        "max_generations": 100000,
+        "fitness_threshold": 1e-12,
+        "stagnation_threshold": 100000,
+        "differential_weight": 0.1,
+        "check_frequency": 10,
+        "min_generations": 10,
+        "crossover_rate": 0.8,
+        "mutation_rate": 0.2,
+        "evolution_algorithm": "DeterministicCrowding"
+    },
+    "result_file": "beam_bending.res.json",
+    "log_file": "beam_bending",
+    "checkpoint_file": "beam_bending"
+}
+
+# keys of a study spec and their defaults
+SPEC_DEFAULTS = {
+    "study": None,
+    "root": None,
+    "base": {},  # overrides of BASE_CONFIG, hyperparams are merged key by key
+    "factors": {},  # factor name and its levels
+    "design": {"type": "full"},
+    "trials": 5,
+    "slurm": "/uufs/chpc.utah.edu/common/home/u1008557/models/fifth_deriv_penalty/doit.slurm",
+    "hours_per_trial": 1.0,  # wall clock hours of one trial, for the node-hour estimate
+    "trials_per_node": 1,  # trials running on one node at the same time
+    "array": {},  # SLURM array settings, see slurm_array.ARRAY_DEFAULTS
+}
+
+
+def loadSpec(specPath):
+    """
+    :param specPath: file path of a study spec (.json)
+    :return: spec dict with defaults for every key left out
+    """
+    with open(specPath) as specFile:
+        spec = json.load(specFile)
+    unknown = set(spec) - set(SPEC_DEFAULTS)
+    if unknown:
+        raise ValueError("Unknown study spec keys: " + ", ".join(sorted(unknown)))
+    spec = dict(SPEC_DEFAULTS, **spec)
+    if spec["root"] is None or not spec["factors"]:
+        raise ValueError("A study spec needs a root and factors")
+    if not spec["root"].endswith("/"):
+        spec["root"] += "/"
+    return spec
+
+
+def baseConfig(spec):
+    """ :return: BASE_CONFIG with the overrides of the spec """
+    config = copy.deepcopy(BASE_CONFIG)
+    for key, value in spec["base"].items():
+        if key == "hyperparams":
+            config["hyperparams"].update(value)
+        else:
+            config[key] = value
+    return config
+
+
+def setFactor(config, factor, value):
+    """
+    Sets one factor in a beam_bending config
+    :param config: beam_bending config dict
+    :param factor: hyperparams key, or a path such as "problem_args.3"
+    :param value: value of the factor
+    """
+    if "." not in factor:
+        config["hyperparams"][factor] = value
+        return
+    *path, last = [int(part) if part.isdigit() else part for part in factor.split(".")]
+    target = config
+    for part in path:
+        target = target[part]
+    target[last] = value
+
+
+def pointConfig(spec, values):
+    """
+    :param spec: study spec
+    :param values: value of each factor of one design point
+    :return: beam_bending config of the point
+    """
+    config = baseConfig(spec)
+    for factor, value in zip(spec["factors"], values):
+        setFactor(config, factor, value)
+    return config
+
+
+def studyPoints(spec):
+    """ :return: design points of the spec as a list of (name, values) """
+    return designPoints(spec["design"], list(spec["factors"].values()))
+
+
+def studyCost(spec, points):
+    """
+    :param spec: study spec
+    :param points: design points of the study
+    :return: dict with the number of points, jobs and node-hours, and the jobs of the full factorial
+    """
+    jobs = len(points) * spec["trials"]
+    full = spec["trials"]
+    for levels in spec["factors"].values():
+        full *= len(levels)
+    return {"points": len(points), "jobs": jobs, "node_hours": jobs * spec["hours_per_trial"] / spec["trials_per_node"],
+            "full_factorial_jobs": full}
+
+
+def printReport(spec, points, cost):
+    """ Prints the design points and the cost of a study """
+    print("{0}: {1} design, {2} factors".format(spec["study"] or spec["root"], spec["design"].get("type", "full"),
+                                               len(spec["factors"])))
+    print("    " + "  ".join(spec["factors"]))
+    for name, values in points:
+        print("{0:>8}  {1}".format(name, "  ".join(str(value) for value in values)))
+    report = "{points} points x {0} trials = {jobs} jobs, {node_hours:.1f} node-hours".format(spec["trials"], **cost)
+    if spec["design"].get("type", "full") != "full":
+        report += " (full factorial of the levels: {full_factorial_jobs} jobs)".format(**cost)
+    print(report)
+
+
+def createDirectory(dirPath):
+    """
+    Create a directory from an absolute filepath
+    If the directory already exists then it is repalced by an empty directory.
+    :param dirPath: Filepath to create
+    """
+    try:
+        os.mkdir(dirPath)
+    except FileExistsError:
+        shutil.rmtree(dirPath)
+        os.mkdir(dirPath)
+
+
+def writeDesign(spec, points):
+    """
+    Writes design.json in the study root: the spec, the generators of a fractional design and the points
+    :param spec: study spec
+    :param points: design points of the study
+    """
+    with open(spec["root"] + "design.json", 'w') as outfile:
+        json.dump({"spec": spec, "generators": designGenerators(spec["design"], len(spec["factors"])),
+                   "points": [{"name": name, "values": values} for name, values in points]}, outfile, indent=4)
+
+
+def populateStudy(spec, points):
+    """
+    Creates a directory per design point with a trial directory per trial, each holding its
+    beam_bending.json and a copy of the slurm script. design.json in the root records the design, see writeDesign.
+    :param spec: study spec
+    :param points: design points of the study
+    """
+    createDirectory(spec["root"])
+    for name, values in points:
+        pointPath = spec["root"] + name + "/"
+        os.mkdir(pointPath)
+        config = pointConfig(spec, values)
+        for trialNumber in range(spec["trials"]):
+            trialPath = "{0}trial{1}".format(pointPath, trialNumber)
+            os.mkdir(trialPath)
+            with open(trialPath + "/beam_bending.json", 'w') as outfile:
+                json.dump(config, outfile, indent=4)
+            shutil.copy(spec["slurm"], trialPath)
+    writeDesign(spec, points)
+
+
+def populateCompact(spec, points):
+    """
+    Creates a study with a few files instead of a directory, config and slurm copy per trial:
+    configs/<point>.json per design point, doit.slurm linked to the slurm script of the spec, and
+    the manifest listing every trial, and design.json.
+    :param spec: study spec
+    :param points: design points of the study
+    :return: manifest dict
+    """
+    createDirectory(spec["root"])
+    os.mkdir(spec["root"] + CONFIG_DIR)
+    configs = {}
+    for name, values in points:
+        configs[name] = "{0}/{1}.json".format(CONFIG_DIR, name)
+        with open(spec["root"] + configs[name], 'w') as outfile:
+            json.dump(pointConfig(spec, values), outfile, indent=4)
+    slurm = os.path.basename(spec["slurm"])
+    os.symlink(spec["slurm"], spec["root"] + slurm)
+
+    rows = [{"point": name, "trial": trialNumber, "dir": "{0}/trial{1}".format(name, trialNumber)}
+            for name, values in points for trialNumber in range(spec["trials"])]
+    manifest = {"study": spec["study"], "slurm": slurm, "configs": configs, "rows": rows}
+    with open(spec["root"] + MANIFEST_NAME, 'w') as outfile:
+        json.dump(manifest, outfile)
+    writeDesign(spec, points)
+    return manifest
+
+
+def loadManifest(studyRoot):
+    """
+    :param studyRoot: root of a study created with populateCompact
+    :return: manifest dict
+    """
+    with open(os.path.join(studyRoot, MANIFEST_NAME)) as manifestFile:
+        return json.load(manifestFile)
+
+
+def prepareTrial(studyRoot, manifest, row):
+    """
+    Makes the directory of one trial of a compact study, with beam_bending.json linked to the config of its point.
+    Safe to call again for a trial that was already prepared.
+    :param studyRoot: root of the study
+    :param manifest: manifest dict
+    :param row: row of the manifest
+    :return: path of the trial directory
+    """
+    trialPath = os.path.join(studyRoot, row["dir"])
+    os.makedirs(trialPath, exist_ok=True)
+    configLink = os.path.join(trialPath, "beam_bending.json")
+    if not os.path.lexists(configLink):
+        os.symlink(os.path.relpath(os.path.join(studyRoot, manifest["configs"][row["point"]]), trialPath), configLink)
+    return trialPath
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a study from a JSON study spec")
+    parser.add_argument("spec", help="file path of the study spec (.json)")
+    parser.add_argument("--create", action="store_true",
+                        help="create the study directories, otherwise only the design and its cost are printed")
+    parser.add_argument("--compact", action="store_true",
+                        help="write one config per design point and a manifest of the trials instead of a "
+                             "directory per trial")
+    parser.add_argument("--array", action="store_true",
+                        help="write a compact study and a SLURM array script running all of its trials")
+    parser.add_argument("--throttle", type=int,
+                        help="number of array tasks running at the same time, overrides the spec")
+    args = parser.parse_args()
+
+    spec = loadSpec(args.spec)
+    if args.throttle is not None:
+        spec["array"] = dict(spec["array"], throttle=args.throttle)
+    points = studyPoints(spec)
+    printReport(spec, points, studyCost(spec, points))
+    if args.create and (args.compact or args.array):
+        manifest = populateCompact(spec, points)
+        if args.array:
+            from slurm_array import writeArrayScripts
+            for path in writeArrayScripts(spec, manifest):
+                print("sbatch " + path)
+    elif args.create:
+        populateStudy(spec, points)
+
+
+if __name__ == "__main__":
+    main()
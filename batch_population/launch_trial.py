@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+Resolves a SLURM array task to its trial. Called by the array scripts of slurm_array.py:
+
+    python3 launch_trial.py <study root> <row>
+
+Makes the directory of row <row> of the study manifest and prints its path.
+"""
+
+import sys
+
+from generate_study import loadManifest, prepareTrial
+
+
+def main():
+    studyRoot, row = sys.argv[1], int(sys.argv[2])
+    manifest = loadManifest(studyRoot)
+    if not 0 <= row < len(manifest["rows"]):
+        sys.exit("Row {0} is not in the manifest of {1} ({2} rows)".format(row, studyRoot, len(manifest["rows"])))
+    print(prepareTrial(studyRoot, manifest, manifest["rows"][row]))
+
+
+if __name__ == "__main__":
+    main()
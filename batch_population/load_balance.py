@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Balances the trials of a study over the nodes they are submitted to.
+
+A trial costs roughly pop_size x stack_size x training points x generations: every generation evaluates
+every individual, and an individual takes time in proportion to its command stack times the number of
+training points it is evaluated on. Trials are packed onto the nodes with
+the longest processing time first heuristic: sorted by cost, each trial goes to the node with the
+least work so far. The most expensive node ends within 4/3 of the best possible, instead of one node
+getting all the pop_size=300, stack_size=100 runs.
+"""
+
+import heapq
+
+DEFAULT_GENERATIONS = 100000  # max_generations of the studies, most trials run until it
+DEFAULT_TRAINING_POINTS = 5  # problem_args[3] of beam_bending.json
+
+
+def trialCost(pop_size, stack_size, training_points=DEFAULT_TRAINING_POINTS, generations=DEFAULT_GENERATIONS):
+    """
+    :param pop_size: population size of the trial
+    :param stack_size: command stack size of the trial
+    :param training_points: number of training points, problem_args[3]
+    :param generations: expected number of generations
+    :return: estimated cost in command evaluations
+    """
+    return float(pop_size) * stack_size * training_points * generations
+
+
+def lptSchedule(costs, n_nodes):
+    """
+    Longest processing time first packing
+    :param costs: estimated cost of each trial
+    :param n_nodes: number of nodes
+    :return: node of each trial (0 to n_nodes - 1) and the total cost of each node
+    """
+    loads = [(0., node) for node in range(n_nodes)]
+    nodes = [None] * len(costs)
+    for i in sorted(range(len(costs)), key=lambda i: -costs[i]):
+        load, node = heapq.heappop(loads)
+        nodes[i] = node
+        heapq.heappush(loads, (load + costs[i], node))
+    totals = [0.] * n_nodes
+    for load, node in loads:
+        totals[node] = load
+    return nodes, totals
+
+
+def printSchedule(labels, nodes, totals, nodeNames):
+    """
+    Prints the trials of each node and its share of the total cost
+    :param labels: label of each trial, i.e. '00101/trial3'
+    :param nodes: node of each trial, from lptSchedule
+    :param totals: total cost of each node, from lptSchedule
+    :param nodeNames: name of each node
+    """
+    work = sum(totals) or 1.
+    for node, name in enumerate(nodeNames):
+        print("\n{0}: {1:.1%} of the estimated work".format(name, totals[node] / work))
+        print([label for label, trialNode in zip(labels, nodes) if trialNode == node])
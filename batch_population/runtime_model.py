@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Predicts the runtime of the trials of a new study from the trials of finished ones.
+
+Every finished trial gives its beam_bending.json and, from its BINGO .log (or the .out file of its job
+when the log has no times), the elapsed time and the generations it reached. The .out and .err files
+of a job are in the trial directory, or for a task of an array study in logs/ of the study root, found
+from the slurm_task file of the trial (see slurm_array.py). Trials SLURM killed at the time limit are
+left out, their runtime is the limit and not the time the trial needed. log(runtime) and
+log(generations) are fit by least squares against log(pop_size), log(stack_size), the rates and
+log(training points). The spread of the residuals gives the recommended --time: the runtime a trial
+stays below with the requested probability, plus a margin.
+
+    python runtime_model.py <finished study root> ... [--save model.json]
+    python runtime_model.py <finished study root> ... --spec <spec.json> [--quantile 0.95]
+    python runtime_model.py --model model.json --spec <spec.json>
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+from statistics import NormalDist
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'results'))
+from checkpoint_index import scan_study
+from convergence import parse_log
+
+CONFIG_NAME = "beam_bending.json"
+QUANTILE = 0.95
+MARGIN = 1.1  # on top of the quantile, for the time the job needs to start up and write its checkpoint
+TIME_LIMIT_MESSAGE = "DUE TO TIME LIMIT"  # slurmstepd: error: *** JOB 123 ON notch272 CANCELLED AT ... DUE TO TIME LIMIT ***
+TAIL_BYTES = 1 << 16  # end of a job file searched for the message
+
+# features of a beam_bending config, log scaled features are positive counts
+FEATURES = [
+    ("log_pop_size", lambda config: np.log(config["hyperparams"]["pop_size"])),
+    ("log_stack_size", lambda config: np.log(config["hyperparams"]["stack_size"])),
+    ("differential_weight", lambda config: config["hyperparams"]["differential_weight"]),
+    ("crossover_rate", lambda config: config["hyperparams"]["crossover_rate"]),
+    ("mutation_rate", lambda config: config["hyperparams"]["mutation_rate"]),
+    ("log_training_points", lambda config: np.log(config["problem_args"][3])),
+]
+
+
+def featureVector(config):
+    """ :return: feature values of a beam_bending config, in the order of FEATURES """
+    return [float(feature(config)) for name, feature in FEATURES]
+
+
+def jobFiles(studyRoot, trialPath):
+    """
+    :param studyRoot: root of the study
+    :param trialPath: trial directory
+    :return: paths of the .out and .err files of the job of a trial, in the trial directory or,
+             for an array task, in logs/ of the study root
+    """
+    with os.scandir(trialPath) as it:
+        paths = sorted(entry.path for entry in it if ".out" in entry.name or ".err" in entry.name)
+    taskPath = os.path.join(trialPath, "slurm_task")
+    if os.path.exists(taskPath):
+        with open(taskPath) as taskFile:
+            arrayJob, task = taskFile.read().split()[:2]  # written by the array script of slurm_array.py
+        paths += sorted(glob.glob(os.path.join(studyRoot, "logs", "{0}_{1}.*".format(arrayJob, task))))
+    return paths
+
+
+def hitTimeLimit(jobPaths):
+    """ :return: True if SLURM cancelled the job of these .out and .err files at its time limit """
+    for path in jobPaths:
+        with open(path, 'rb') as jobFile:
+            jobFile.seek(max(0, os.fstat(jobFile.fileno()).st_size - TAIL_BYTES))  # the message is written last
+            if TIME_LIMIT_MESSAGE.encode() in jobFile.read():
+                return True
+    return False
+
+
+def trialRuntime(trialPath, logName, jobPaths):
+    """
+    :param trialPath: trial directory
+    :param logName: name of the BINGO .log file of the trial, or None
+    :param jobPaths: .out and .err files of the job of the trial, see jobFiles
+    :return: elapsed seconds and generations reached, or None if neither the log nor an .out file has times
+    """
+    candidates = [os.path.join(trialPath, logName)] if logName else []
+    candidates += [path for path in jobPaths if ".out" in os.path.basename(path)]
+    for path in candidates:
+        generation, elapsed, fitness = parse_log(path)
+        times = elapsed[~np.isnan(elapsed)]
+        if len(times):
+            return float(times.max()), int(generation.max())
+    return None
+
+
+def mineTrials(studyRoots):
+    """
+    Collects the config, runtime and generations of every finished trial
+    :param studyRoots: roots of finished studies
+    :return: feature matrix, runtimes in seconds and generations, the number of trials without times
+             and the number of trials killed at the time limit
+    """
+    features, runtimes, generations, skipped, killed = [], [], [], 0, 0
+    for studyRoot in studyRoots:
+        for entry in scan_study(studyRoot).trials():
+            trialPath = os.path.join(studyRoot, entry['dir'])
+            configPath = os.path.join(trialPath, CONFIG_NAME)
+            if not os.path.exists(configPath):
+                skipped += 1
+                continue
+            jobPaths = jobFiles(studyRoot, trialPath)
+            if hitTimeLimit(jobPaths):
+                killed += 1
+                continue
+            run = trialRuntime(trialPath, entry['log'], jobPaths)
+            if run is None or run[0] <= 0:
+                skipped += 1
+                continue
+            with open(configPath) as configFile:
+                features.append(featureVector(json.load(configFile)))
+            runtimes.append(run[0])
+            generations.append(max(run[1], 1))
+    return (np.array(features).reshape([-1, len(FEATURES)]), np.array(runtimes), np.array(generations), skipped,
+            killed)
+
+
+class RuntimeModel:
+    """ Log-linear least squares models of the runtime and generations of a trial """
+
+    def __init__(self, coefficients, sigma, generation_coefficients, generation_sigma, trials):
+        """
+        :param coefficients: intercept and coefficient of each feature of log(runtime in seconds)
+        :param sigma: standard deviation of the residuals of log(runtime)
+        :param generation_coefficients: intercept and coefficients of log(generations)
+        :param generation_sigma: standard deviation of the residuals of log(generations)
+        :param trials: number of trials the model was fit to
+        """
+        self.coefficients = np.asarray(coefficients, dtype=float)
+        self.sigma = float(sigma)
+        self.generation_coefficients = np.asarray(generation_coefficients, dtype=float)
+        self.generation_sigma = float(generation_sigma)
+        self.trials = trials
+
+    def predict(self, config, quantile=QUANTILE):
+        """
+        :param config: beam_bending config dict
+        :param quantile: probability of a trial finishing within the recommended time
+        :return: dict with the median runtime and recommended time limit in hours, and the median generations
+        """
+        x = np.concatenate([[1.], featureVector(config)])
+        logRuntime = x @ self.coefficients
+        z = NormalDist().inv_cdf(quantile)
+        return {"hours": float(np.exp(logRuntime) / 3600.),
+                "limit_hours": float(np.exp(logRuntime + z * self.sigma) * MARGIN / 3600.),
+                "generations": float(np.exp(x @ self.generation_coefficients))}
+
+    def save(self, modelPath):
+        with open(modelPath, 'w') as modelFile:
+            json.dump({"features": [name for name, feature in FEATURES], "coefficients": self.coefficients.tolist(),
+                       "sigma": self.sigma, "generation_coefficients": self.generation_coefficients.tolist(),
+                       "generation_sigma": self.generation_sigma, "trials": self.trials}, modelFile, indent=4)
+
+
+def fitLogLinear(features, values):
+    """
+    Least squares fit of log(values). Features that do not vary in the data get a coefficient of 0,
+    so predictions for them fall back on the intercept.
+    :return: intercept and coefficients, and the standard deviation of the residuals
+    """
+    varies = np.ptp(features, axis=0) > 0 if len(features) else np.zeros(len(FEATURES), dtype=bool)
+    X = np.column_stack([np.ones(len(features)), features[:, varies]])
+    y = np.log(values)
+    solution, residuals, rank, _ = np.linalg.lstsq(X, y, rcond=None)
+    coefficients = np.zeros(1 + len(FEATURES))
+    coefficients[0] = solution[0]
+    coefficients[1:][varies] = solution[1:]
+    dof = max(len(y) - rank, 1)
+    sigma = np.sqrt(np.sum((y - X @ solution) ** 2) / dof)
+    return coefficients, sigma
+
+
+def fitModel(studyRoots):
+    """
+    :param studyRoots: roots of finished studies
+    :return: RuntimeModel
+    """
+    features, runtimes, generations, skipped, killed = mineTrials(studyRoots)
+    if len(runtimes) == 0:
+        raise ValueError("No finished trials with times in " + ", ".join(studyRoots))
+    print("{0} trials, {1} without times, {2} killed at the time limit".format(len(runtimes), skipped, killed))
+    if killed:
+        print("    the killed trials ran longer than their limit, --time should be above it")
+    coefficients, sigma = fitLogLinear(features, runtimes)
+    generation_coefficients, generation_sigma = fitLogLinear(features, generations)
+    return RuntimeModel(coefficients, sigma, generation_coefficients, generation_sigma, len(runtimes))
+
+
+def loadModel(modelPath):
+    with open(modelPath) as modelFile:
+        saved = json.load(modelFile)
+    return RuntimeModel(saved["coefficients"], saved["sigma"], saved["generation_coefficients"],
+                        saved["generation_sigma"], saved["trials"])
+
+
+def predictStudy(model, spec, quantile=QUANTILE):
+    """
+    Predicts every design point of a study spec and prints the recommended time limit
+    :param model: RuntimeModel
+    :param spec: study spec, see generate_study.py
+    :param quantile: probability of a trial finishing within the recommended time
+    :return: list of (point name, prediction dict)
+    """
+    from generate_study import pointConfig, studyPoints
+    from slurm_array import slurmTime
+    predictions = [(name, model.predict(pointConfig(spec, values), quantile)) for name, values in studyPoints(spec)]
+    print("{0:>8} {1:>10} {2:>12} {3:>12}".format("point", "hours", "generations", "--time"))
+    for name, prediction in predictions:
+        print("{0:>8} {hours:10.2f} {generations:12.0f} {1:>12}".format(name, slurmTime(prediction["limit_hours"]),
+                                                                         **prediction))
+    hours = sum(prediction["hours"] for name, prediction in predictions) * spec["trials"]
+    limit = max(prediction["limit_hours"] for name, prediction in predictions)
+    print("expected {0:.1f} node-hours for {1} jobs, --time={2} covers {3:.0%} of the trials of every point"
+          .format(hours / spec["trials_per_node"], len(predictions) * spec["trials"], slurmTime(limit), quantile))
+    return predictions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Predict the runtime of trials from finished studies")
+    parser.add_argument("roots", nargs="*", help="roots of finished studies to fit the model to")
+    parser.add_argument("--model", help="load the model from this .json instead of fitting it")
+    parser.add_argument("--save", help="save the fitted model to this .json")
+    parser.add_argument("--spec", help="study spec to predict, see generate_study.py")
+    parser.add_argument("--quantile", type=float, default=QUANTILE,
+                        help="probability of a trial finishing within the recommended --time")
+    args = parser.parse_args()
+
+    if args.model:
+        model = loadModel(args.model)
+    elif args.roots:
+        model = fitModel(args.roots)
+    else:
+        parser.error("give finished study roots or --model")
+    if args.save:
+        model.save(args.save)
+    if args.spec:
+        from generate_study import loadSpec
+        predictStudy(model, loadSpec(args.spec), args.quantile)
+
+
+if __name__ == "__main__":
+    main()
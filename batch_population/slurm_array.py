@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+SLURM job arrays of compact studies (see generate_study.py --compact).
+
+Instead of submitting one job per trial, a study is submitted as one array job. Task i of the array
+runs row i of the manifest: launch_trial.py makes its trial directory, with beam_bending.json linked
+to the config of its design point, and prints the path. The task changes into it and runs the body of
+the study's slurm script there, exactly like the per trial copies of doit.slurm did. SLURM_SUBMIT_DIR
+is set to the trial directory as well, so a script that changes into it finds its trial, as it did when
+each trial was submitted from its own directory. Run with bash, its #SBATCH lines are only comments, so
+they are copied into the array script, all but the ones the array script sets itself (job name, array,
+time, output and error, and partition, account and options when the spec gives them). "%N" limits how
+many tasks run at the same time. Studies larger than the array size limit of the cluster are split over
+several array scripts, each with the offset of its first row.
+
+    sbatch study.slurm
+"""
+
+import math
+import os
+
+ARRAY_NAME = "study"
+LAUNCHER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "launch_trial.py")
+
+# short #SBATCH options of the ones the array script sets
+SHORT_OPTIONS = {"J": "job-name", "a": "array", "t": "time", "o": "output", "e": "error", "p": "partition",
+                 "A": "account", "N": "nodes", "n": "ntasks", "c": "cpus-per-task", "w": "nodelist"}
+
+# keys of the "array" entry of a study spec and their defaults
+ARRAY_DEFAULTS = {
+    "throttle": None,  # tasks running at the same time, the %N of --array
+    "time": None,  # --time of every task, from hours_per_trial if None
+    "partition": None,
+    "account": None,
+    "max_array_size": 1000,  # MaxArraySize of the cluster
+    "options": [],  # further #SBATCH lines, i.e. ["--nodes=1", "--ntasks=16"]
+}
+
+
+def slurmTime(hours):
+    """ :return: hours as a SLURM time limit, i.e. 1.5 -> '01:30:00' or 30 -> '1-06:00:00' """
+    minutes = int(math.ceil(hours * 60))
+    days, minutes = divmod(minutes, 24 * 60)
+    clock = "{0:02d}:{1:02d}:00".format(*divmod(minutes, 60))
+    return "{0}-{1}".format(days, clock) if days else clock
+
+
+def optionName(option):
+    """ :return: long name of an #SBATCH option, i.e. '-t 2:00:00' -> 'time', '--ntasks=16' -> 'ntasks' """
+    option = option.strip()
+    if option.startswith("--"):
+        return option[2:].split("=")[0].split()[0]
+    return SHORT_OPTIONS.get(option[1:2], option[1:2])
+
+
+def scriptDirectives(slurmPath):
+    """
+    :param slurmPath: file path of a slurm script
+    :return: options of its #SBATCH lines, sbatch stops reading them at the first command
+    """
+    directives = []
+    with open(slurmPath) as slurmFile:
+        for line in slurmFile:
+            line = line.strip()
+            if line.startswith("#SBATCH"):
+                directives.append(line[len("#SBATCH"):].strip())
+            elif line and not line.startswith("#"):
+                break
+    return directives
+
+
+def arrayScript(spec, manifest, offset, count, settings):
+    """
+    :param spec: study spec
+    :param manifest: manifest dict of the compact study
+    :param offset: first manifest row of the array
+    :param count: number of tasks of the array
+    :param settings: array settings, ARRAY_DEFAULTS with the "array" entry of the spec
+    :return: text of the array script
+    """
+    throttle = "" if settings["throttle"] is None else "%{0}".format(settings["throttle"])
+    lines = ["#!/bin/bash",
+             "#SBATCH --job-name={0}".format(manifest["study"] or "study"),
+             "#SBATCH --array=0-{0}{1}".format(count - 1, throttle),
+             "#SBATCH --time={0}".format(settings["time"] or slurmTime(spec["hours_per_trial"])),
+             "#SBATCH -o {0}logs/%A_%a.out-%N".format(spec["root"]),
+             "#SBATCH -e {0}logs/%A_%a.err-%N".format(spec["root"])]
+    for option in ("partition", "account"):
+        if settings[option] is not None:
+            lines.append("#SBATCH --{0}={1}".format(option, settings[option]))
+    lines += ["#SBATCH " + option for option in settings["options"]]
+    overridden = {"job-name", "array", "time", "output", "error"}
+    overridden |= {option for option in ("partition", "account") if settings[option] is not None}
+    overridden |= {optionName(option) for option in settings["options"]}
+    lines += ["#SBATCH " + option for option in scriptDirectives(spec["root"] + manifest["slurm"])
+              if optionName(option) not in overridden]
+    lines += ["",
+              "# row {0} + task id of {1}{2} is the trial this task runs".format(offset, spec["root"], "trials.json"),
+              "row=$(( {0} + SLURM_ARRAY_TASK_ID ))".format(offset),
+              "trialPath=$(python3 {0} {1} $row) || exit 1".format(LAUNCHER, spec["root"]),
+              "cd $trialPath || exit 1",
+              "export SLURM_SUBMIT_DIR=$PWD  # the shared script may cd $SLURM_SUBMIT_DIR",
+              "echo $SLURM_ARRAY_JOB_ID $SLURM_ARRAY_TASK_ID $SLURM_JOB_ID > slurm_task",
+              "bash {0}{1}".format(spec["root"], manifest["slurm"]),
+              ""]
+    return "\n".join(lines)
+
+
+def writeArrayScripts(spec, manifest):
+    """
+    Writes study.slurm, or study_0.slurm, study_1.slurm, ... if the study is larger than max_array_size
+    :param spec: study spec
+    :param manifest: manifest dict of the compact study
+    :return: paths of the array scripts
+    """
+    settings = dict(ARRAY_DEFAULTS, **spec.get("array", {}))
+    rows = len(manifest["rows"])
+    size = settings["max_array_size"]
+    os.makedirs(spec["root"] + "logs", exist_ok=True)
+    paths = []
+    for n, offset in enumerate(range(0, rows, size)):
+        name = ARRAY_NAME if rows <= size else "{0}_{1}".format(ARRAY_NAME, n)
+        path = "{0}{1}.slurm".format(spec["root"], name)
+        with open(path, 'w') as scriptFile:
+            scriptFile.write(arrayScript(spec, manifest, offset, min(size, rows - offset), settings))
+        paths.append(path)
+    return paths
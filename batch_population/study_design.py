@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Designs of hyperparameter studies.
+
+Every design returns the points of a study as a list of (name, values) where values has one entry per
+factor. Two level designs name their points with a binary like the existing studies (00101 runs factor
+3 and 5 at their high level), so results/factorial.py can rank their effects. A 2^(k-p) fraction
+aliases effects with each other; factorial.py finds the aliases from the binaries, fits one term of
+each alias set and lists the others next to it. The generators of a fraction are recorded in design.json.
+Space filling designs name their points p000, p001, ... and draw every factor from the range of its levels.
+
+    full        every combination of the levels of every factor
+    fractional  2^(k-p) fraction of a two level design, from generators such as "E=ABCD"
+    lhs         Latin hypercube sample
+    sobol       Sobol sequence
+"""
+
+import itertools
+import string
+
+import numpy as np
+
+# minimum aberration generators of 2^(k-p) designs, keyed by (k, p)
+GENERATORS = {
+    (3, 1): ["C=AB"],
+    (4, 1): ["D=ABC"],
+    (5, 1): ["E=ABCD"],
+    (5, 2): ["D=AB", "E=AC"],
+    (6, 1): ["F=ABCDE"],
+    (6, 2): ["E=ABC", "F=BCD"],
+    (6, 3): ["D=AB", "E=AC", "F=BC"],
+    (7, 1): ["G=ABCDEF"],
+    (7, 2): ["F=ABCD", "G=ABDE"],
+    (7, 3): ["E=ABC", "F=BCD", "G=ACD"],
+    (7, 4): ["D=AB", "E=AC", "F=BC", "G=ABC"],
+}
+
+# Joe and Kuo direction numbers of Sobol dimensions 2 to 13: (degree s, coefficients a, initial m)
+SOBOL_DIRECTIONS = [
+    (1, 0, [1]),
+    (2, 1, [1, 3]),
+    (3, 1, [1, 3, 1]),
+    (3, 2, [1, 1, 1]),
+    (4, 1, [1, 1, 3, 3]),
+    (4, 4, [1, 3, 5, 13]),
+    (5, 2, [1, 1, 5, 5, 17]),
+    (5, 4, [1, 1, 5, 5, 5]),
+    (5, 7, [1, 1, 7, 11, 19]),
+    (5, 11, [1, 1, 5, 1, 1]),
+    (5, 13, [1, 1, 1, 3, 11]),
+    (5, 14, [1, 3, 5, 5, 31]),
+]
+SOBOL_BITS = 30
+
+
+def fullFactorial(levels):
+    """
+    :param levels: list of the levels of each factor
+    :return: list of (name, values). Names are the level index of each factor, i.e. 00101
+    """
+    separator = '_' if max(len(factor) for factor in levels) > 10 else ''
+    points = []
+    for index in itertools.product(*[range(len(factor)) for factor in levels]):
+        points.append((separator.join(map(str, index)), [factor[i] for factor, i in zip(levels, index)]))
+    return points
+
+
+def fractionalSigns(k, generators):
+    """
+    Sign table of a 2^(k-p) design
+    :param k: number of factors
+    :param generators: list of generators, i.e. ["D=AB", "E=AC"]. Factors are the letters A, B, ... in order
+    :return: array of shape [2^(k-p), k] of -1 and +1
+    """
+    letters = string.ascii_uppercase[:k]
+    generated = {}
+    for generator in generators:
+        factor, word = generator.replace(' ', '').upper().split('=')
+        sign = -1 if word.startswith('-') else 1
+        generated[factor] = (sign, word.lstrip('-'))
+    base = [letter for letter in letters if letter not in generated]
+    if len(base) + len(generated) != k or any(set(word) - set(base) for sign, word in generated.values()):
+        raise ValueError("Generators {0} do not define a design of {1} factors".format(generators, k))
+
+    columns = {letter: column for letter, column in
+               zip(base, np.array(list(itertools.product([-1, 1], repeat=len(base)))).T)}
+    for factor, (sign, word) in generated.items():
+        columns[factor] = sign * np.prod([columns[letter] for letter in word], axis=0)
+    return np.column_stack([columns[letter] for letter in letters])
+
+
+def fractionalGenerators(k, p=1, generators=None):
+    """
+    :param k: number of factors
+    :param p: number of generated factors
+    :param generators: list of generators, taken from GENERATORS if None
+    :return: list of generators of the 2^(k-p) design
+    """
+    if generators is not None:
+        return generators
+    if (k, p) not in GENERATORS:
+        raise ValueError("No default generators of a 2^({0}-{1}) design, give them in the spec".format(k, p))
+    return GENERATORS[k, p]
+
+
+def fractionalFactorial(levels, p=1, generators=None):
+    """
+    :param levels: list of the low and high level of each factor
+    :param p: number of generated factors, the design has 2^(k-p) points
+    :param generators: list of generators, taken from GENERATORS if None
+    :return: list of (name, values). Names are the binary of the levels, i.e. 00101
+    """
+    if any(len(factor) != 2 for factor in levels):
+        raise ValueError("A fractional factorial design needs two levels per factor")
+    k = len(levels)
+    signs = fractionalSigns(k, fractionalGenerators(k, p, generators))
+    points = []
+    for row in signs:
+        index = (row + 1) // 2
+        points.append((''.join(map(str, index)), [factor[i] for factor, i in zip(levels, index)]))
+    return sorted(points)
+
+
+def latinHypercube(n_points, n_factors, seed=0):
+    """
+    :return: array of shape [n_points, n_factors] in [0, 1), one point in each of n_points strata per factor
+    """
+    rng = np.random.default_rng(seed)
+    strata = np.column_stack([rng.permutation(n_points) for _ in range(n_factors)])
+    return (strata + rng.random((n_points, n_factors))) / n_points
+
+
+def sobolSequence(n_points, n_factors, skip=1):
+    """
+    :param n_points: number of points
+    :param n_factors: number of dimensions, at most 1 + len(SOBOL_DIRECTIONS)
+    :param skip: points skipped at the start of the sequence, the first point is the corner 0
+    :return: array of shape [n_points, n_factors] in [0, 1)
+    """
+    if n_factors > 1 + len(SOBOL_DIRECTIONS):
+        raise ValueError("Sobol designs support up to {0} factors".format(1 + len(SOBOL_DIRECTIONS)))
+    directions = np.zeros((n_factors, SOBOL_BITS), dtype=np.int64)
+    directions[0] = [1 << (SOBOL_BITS - 1 - bit) for bit in range(SOBOL_BITS)]
+    for dim, (s, a, m) in enumerate(SOBOL_DIRECTIONS[:n_factors - 1], start=1):
+        v = [m[bit] << (SOBOL_BITS - 1 - bit) for bit in range(s)]
+        for bit in range(s, SOBOL_BITS):
+            value = v[bit - s] ^ (v[bit - s] >> s)
+            for j in range(1, s):
+                if (a >> (s - 1 - j)) & 1:
+                    value ^= v[bit - j]
+            v.append(value)
+        directions[dim] = v
+
+    # Gray code order, point i + 1 flips the direction of the lowest zero bit of i
+    points = np.zeros((skip + n_points, n_factors), dtype=np.int64)
+    for i in range(1, skip + n_points):
+        bit = (i & -i).bit_length() - 1  # lowest zero bit of i - 1
+        points[i] = points[i - 1] ^ directions[:, bit]
+    return points[skip:] / float(1 << SOBOL_BITS)
+
+
+def scalePoints(unit, levels):
+    """
+    Scales unit points to the range of the levels of each factor. Factors with integer levels stay integers.
+    :param unit: array of shape [points, factors] in [0, 1)
+    :param levels: list of the levels of each factor
+    :return: list of (name, values) named p000, p001, ...
+    """
+    points = []
+    width = max(3, len(str(len(unit) - 1)))
+    for i, row in enumerate(unit):
+        values = []
+        for u, factor in zip(row, levels):
+            low, high = min(factor), max(factor)
+            if all(isinstance(level, int) for level in factor):
+                values.append(int(low + np.floor(u * (high - low + 1))))
+            else:
+                values.append(float(low + u * (high - low)))
+        points.append(('p' + str(i).zfill(width), values))
+    return points
+
+
+def designP(design):
+    """ :return: number of generated factors of a fractional design """
+    return design.get('p', len(design.get('generators', [])) or 1)
+
+
+def designGenerators(design, n_factors):
+    """
+    :param design: design of a study spec
+    :param n_factors: number of factors
+    :return: generators of a fractional design, None for other designs
+    """
+    if design.get('type', 'full') != 'fractional':
+        return None
+    return fractionalGenerators(n_factors, designP(design), design.get('generators'))
+
+
+def designPoints(design, levels):
+    """
+    :param design: design of a study spec, i.e. {"type": "fractional", "p": 2} or {"type": "lhs", "points": 20}
+    :param levels: list of the levels of each factor
+    :return: list of (name, values)
+    """
+    kind = design.get('type', 'full')
+    if kind == 'full':
+        return fullFactorial(levels)
+    if kind == 'fractional':
+        return fractionalFactorial(levels, designP(design), design.get('generators'))
+    if kind == 'lhs':
+        return scalePoints(latinHypercube(design['points'], len(levels), design.get('seed', 0)), levels)
+    if kind == 'sobol':
+        return scalePoints(sobolSequence(design['points'], len(levels)), levels)
+    raise ValueError("Unknown design type " + kind)
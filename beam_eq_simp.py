@@ -1,37 +1,52 @@
-# -*- coding: utf-8 -*-
-""" Sam Parry u1008557 04/06/21"""
-from sympy import *
-def simplify_beam_eq(equation):
-    """
-    Simplifies the equation returned by the BINGO beam_bending problem.
-    :param equation: Unsimplifies expression as a String
-    :return: Expanded and Simplified polynomial
-    """
-    eq = equation.replace('X_0', 'x').replace(')(', '*')
-    x = symbols('x')
-    smpl = str(simplify(eq).expand())   # simplifies and expands the eq.
-    smpl = str(smpl).replace('*I', '')  # converts eq back to a string and removes any potential imaginary numbers
-    return smpl
-
-
-def main():
-    # 3 unsimplified sample equations
-    eq = [
-        '(X_0 + -10.000000148238323 - (((X_0)((X_0 + -10.000000148238323)/(-10.000000148238323) ))((X_0 + '
-        '-10.000000148238323)/(-10.000000148238323) )))((X_0)/(-4799.999951370799) )',
-
-        '(((-986.4820369723794)/(5.000000223163965 + 5.000000223163965)  + (X_0)(X_0 - (5.000000223163965 + '
-        '5.000000223163965)))/(474535.8931856667) )((X_0)(X_0 - (5.000000223163965 + 5.000000223163965)))',
-
-        '(((((X_0)((-2.0737034047292067)/(-2.0737034047292067) ))/((-1480.7306455862074)/((-2.0737034047292067)/('
-        '-2.0737034047292067) ) ) )(-2.0737034047292067))((-1480.7306455862074 - ((-2.0737034047292067)('
-        '-2.0737034047292067)))^((-2.0737034047292067)^(-2.0737034047292067)) - ((X_0)((-2.0737034047292067)/('
-        '-2.0737034047292067) ) - ((-1480.7306455862074 - ((-2.0737034047292067)(-2.0737034047292067)))^(('
-        '-2.0737034047292067)^(-2.0737034047292067))))) + 0.15039612381462963)(((((X_0)((-2.0737034047292067)/('
-        '-2.0737034047292067) ))/((-1480.7306455862074)/((-2.0737034047292067)/(-2.0737034047292067) ) ) )('
-        '-2.0737034047292067))((-1480.7306455862074 - ((-2.0737034047292067)(-2.0737034047292067)))^(('
-        '-2.0737034047292067)^(-2.0737034047292067)) - ((X_0)((-2.0737034047292067)/(-2.0737034047292067) ) - (('
-        '-1480.7306455862074 - ((-2.0737034047292067)(-2.0737034047292067)))^((-2.0737034047292067)^('
-        '-2.0737034047292067))))))']
-    print(simplify_beam_eq(eq[0]))
-main()
+# -*- coding: utf-8 -*-
+""" Sam Parry u1008557 04/06/21"""
+import os
+import sys
+
+# share the on-disk simplification cache with the results scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results'))
+from polynomial_fit import fit_individual
+from bingo_parser import is_polynomial
+from simplification import Simplification, DEFAULT_TIME_BUDGET
+
+
+def simplify_beam_eq(equation, best_ind=None, time_budget=DEFAULT_TIME_BUDGET):
+    """
+    Simplifies the equation returned by the BINGO beam_bending problem with results/simplification.py,
+    so the tiers, the time budget and the check for complex models apply. Results are memoized on disk
+    (see results/simplify_cache.py).
+    :param equation: Unsimplifies expression as a String
+    :param best_ind: BINGO individual of the equation. If given and the equation is a polynomial by its
+                     structure, its coefficients are recovered numerically instead of simplifying
+    :param time_budget: seconds full sympy simplification may take, the equation is returned as it is after that
+    :return: Expanded and Simplified polynomial in x. A complex or timed out equation is returned as it is
+    """
+    if best_ind is not None and is_polynomial(equation):
+        fit = fit_individual(best_ind)
+        if fit.is_polynomial:
+            return fit.as_string('x')
+
+    return str(Simplification(equation, time_budget=time_budget).result).replace('X_0', 'x')
+
+
+def main():
+    # 3 unsimplified sample equations
+    eq = [
+        '(X_0 + -10.000000148238323 - (((X_0)((X_0 + -10.000000148238323)/(-10.000000148238323) ))((X_0 + '
+        '-10.000000148238323)/(-10.000000148238323) )))((X_0)/(-4799.999951370799) )',
+
+        '(((-986.4820369723794)/(5.000000223163965 + 5.000000223163965)  + (X_0)(X_0 - (5.000000223163965 + '
+        '5.000000223163965)))/(474535.8931856667) )((X_0)(X_0 - (5.000000223163965 + 5.000000223163965)))',
+
+        '(((((X_0)((-2.0737034047292067)/(-2.0737034047292067) ))/((-1480.7306455862074)/((-2.0737034047292067)/('
+        '-2.0737034047292067) ) ) )(-2.0737034047292067))((-1480.7306455862074 - ((-2.0737034047292067)('
+        '-2.0737034047292067)))^((-2.0737034047292067)^(-2.0737034047292067)) - ((X_0)((-2.0737034047292067)/('
+        '-2.0737034047292067) ) - ((-1480.7306455862074 - ((-2.0737034047292067)(-2.0737034047292067)))^(('
+        '-2.0737034047292067)^(-2.0737034047292067))))) + 0.15039612381462963)(((((X_0)((-2.0737034047292067)/('
+        '-2.0737034047292067) ))/((-1480.7306455862074)/((-2.0737034047292067)/(-2.0737034047292067) ) ) )('
+        '-2.0737034047292067))((-1480.7306455862074 - ((-2.0737034047292067)(-2.0737034047292067)))^(('
+        '-2.0737034047292067)^(-2.0737034047292067)) - ((X_0)((-2.0737034047292067)/(-2.0737034047292067) ) - (('
+        '-1480.7306455862074 - ((-2.0737034047292067)(-2.0737034047292067)))^((-2.0737034047292067)^('
+        '-2.0737034047292067))))))']
+    print(simplify_beam_eq(eq[0]))
+main()
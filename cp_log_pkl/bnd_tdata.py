@@ -1,8 +1,8 @@
 # -*- coding: utf-8 -*-
 """ @author: Sam """
 
-import shutil
 import os
+from harvest import copy_trial
 
 # directory labels
 scratch = "/scratch/kingspeak/serial/u1008557/"
@@ -23,11 +23,5 @@ for t in tValues:
                     job_id = entry.name.split('.')[0]
         source = scratch + job_id + "/"
 
-        # copies all .pkl & .log files from the scratch dir to the test dir.
-        for filename in os.listdir(source):
-            if filename.endswith('.pkl'):
-                fileSource = source + filename
-                shutil.copy(fileSource, dest)
-            if filename.endswith('.log'):
-                fileSource = source + filename
-                shutil.copy(fileSource, dest)
+        # copies all .pkl & .log files from the scratch dir to the test dir and summarizes the latest .pkl
+        copy_trial(source, dest, ('.pkl', '.log'))
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+Copies the files of a finished job from scratch into its test directory and writes the summary
+of the latest checkpoint next to the copied pickle (see results/trial_summary.py). The results
+scripts then read the few kB summary instead of unpickling the archipelago from the home directory.
+"""
+
+import importlib.util
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'results'))
+from checkpoint_index import latest_checkpoint
+
+# trial_summary only imports bingo when it unpickles a checkpoint, so look for bingo up front
+if importlib.util.find_spec('bingo') is not None:
+    from trial_summary import harvest_summary
+else:  # bingo is not on the PYTHONPATH, only copy the files
+    harvest_summary = None
+    print('bingo could not be imported, checkpoint summaries are not written')
+
+
+def copy_trial(source, dest, suffixes=None):
+    """
+    Copies the files of a job and summarizes its latest checkpoint
+    :param source: scratch directory of the job
+    :param dest: test directory of the trial
+    :param suffixes: only copy files ending in one of these, i.e. ('.pkl', '.log'). None copies every file
+    A checkpoint that can not be loaded is reported and the harvest goes on with the next trial.
+    """
+    names = [name for name in os.listdir(source) if suffixes is None or name.endswith(tuple(suffixes))]
+    for filename in names:
+        shutil.copy(os.path.join(source, filename), dest)
+
+    pkl = latest_checkpoint(names)
+    if pkl is not None and harvest_summary is not None:
+        try:
+            harvest_summary(os.path.join(source, pkl), os.path.join(dest, pkl))
+        except Exception as e:  # i.e. a pickle truncated by a job killed while checkpointing
+            print('could not summarize {0}, the files are copied: {1!r}'.format(os.path.join(source, pkl), e))
@@ -6,8 +6,7 @@
 # cp /scratch/kingspeak/serial/u1008557/JOBID#/*.pkl .; 
 # cp /scratch/kingspeak/serial/u1008557/JOBID#/*.log .;
 
-import shutil
-import os
+from harvest import copy_trial
 
 # directory labels
 scratch = "/scratch/kingspeak/serial/u1008557/"
@@ -27,11 +26,5 @@ for value in values:
         k += 1
         dest = destPath + value + "/" + trial + "/"
         
-        # copies all .pkl & .log files from the scratch dir to the test dir.
-        for filename in os.listdir(source): 
-            if filename.endswith('.pkl'):
-                fileSource = source + filename
-                shutil.copy(fileSource, dest)
-            if filename.endswith('.log'):
-                fileSource = source + filename
-                shutil.copy(fileSource, dest)
\ No newline at end of file
+        # copies all .pkl & .log files from the scratch dir to the test dir and summarizes the latest .pkl
+        copy_trial(source, dest, ('.pkl', '.log'))
\ No newline at end of file
@@ -4,8 +4,7 @@ Created on Sat Oct  3 16:24:04 2020
 Version 10/23/20
 @author: Sam
 """
-import shutil
-import os
+from harvest import copy_trial
 
 # directory labels
 scratch = "/scratch/kingspeak/serial/u1008557/"
@@ -35,7 +34,5 @@ for i in range(len(binaries)):
         k += 1
         destination = "/uufs/chpc.utah.edu/common/home/u1008557/tests/{0}/{1}/{2}/".format(test_dir, binaries[i], trials[j])
 
-        # copies all files from the scratch dir to the test dir.
-        for filename in os.listdir(source):
-            fileSource = source + filename
-            shutil.copy(fileSource, destination)
+        # copies all files from the scratch dir to the test dir and summarizes the latest .pkl
+        copy_trial(source, destination)
@@ -1,8 +1,7 @@
 # -*- coding: utf-8 -*-
 # author: Sam Parry u1008557
 
-import shutil
-import os
+from harvest import copy_trial
 
 # directory labels
 scratch = "/scratch/kingspeak/serial/u1008557/"
@@ -32,7 +31,5 @@ for i in range(len(binaries)):
     k += 1
     destination = "/uufs/chpc.utah.edu/common/home/u1008557/tests/{0}/{1}/".format(test_dir, binaries[i])
 
-    # copies all files from the scratch dir to the test dir.
-    for filename in os.listdir(source):
-        fileSource = source + filename
-        shutil.copy(fileSource, destination)
+    # copies all files from the scratch dir to the test dir and summarizes the latest .pkl
+    copy_trial(source, destination)
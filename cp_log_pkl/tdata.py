@@ -6,8 +6,7 @@
 # cp /scratch/kingspeak/serial/u1008557/JOBID#/*.pkl .; 
 # cp /scratch/kingspeak/serial/u1008557/JOBID#/*.log .;
 
-import shutil
-import os
+from harvest import copy_trial
 
 # directory labels
 scratch = "/scratch/kingspeak/serial/u1008557/"
@@ -29,11 +28,5 @@ for t in tValues:
             k += 1
             dest = "{0}/{1}/{2}/{3}/".format(destPath, t, binary, trial)
 
-            # copies all .pkl & .log files from the scratch dir to the test dir.
-            for filename in os.listdir(source):
-                if filename.endswith('.pkl'):
-                    fileSource = source + filename
-                    shutil.copy(fileSource, dest)
-                if filename.endswith('.log'):
-                    fileSource = source + filename
-                    shutil.copy(fileSource, dest)
+            # copies all .pkl & .log files from the scratch dir to the test dir and summarizes the latest .pkl
+            copy_trial(source, dest, ('.pkl', '.log'))
@@ -4,6 +4,10 @@ import shutil
 import os
 import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "batch_population"))
+from batch_population_tdata import getParams
+from load_balance import lptSchedule, printSchedule, trialCost
+
 #INPUT1: highest binary folder that we DONT WANT TO RUN
 #INPUT2: parent directory of containing the binaries
 
@@ -33,38 +37,22 @@ for a in (0, 1):
                         if curBinary == input:
                             metThreshold = True
 
-# keeps track of which binaries have which node
-notch272 = []
-notch273 = []
-notch274 = []
-
 trials = ["trial0", "trial1", "trial2", "trial3", "trial4"]
-biLength = len(binariesToChange)
-for i in range(biLength):
-    #determine which doit file to use
-    if (i < biLength//3):
-        notch272.append(binariesToChange[i])
-        newDoit = doit1File
-    elif (i < 2*biLength//3):
-        notch273.append(binariesToChange[i])
-        newDoit = doit2File
-    else:
-        notch274.append(binariesToChange[i])
-        newDoit = doit3File
-        
-    for j in range(len(trials)):
-        # replace existing doit.slurm with new doit.slurm
-        dest = "/uufs/chpc.utah.edu/common/home/u1008557/" + sys.argv[-2] + "/" + binariesToChange[i] + "/" + trials[j] + "/doit.slurm"
-        os.remove(dest)
-        shutil.copy(newDoit, dest)
+doitFiles = [doit1File, doit2File, doit3File]
+
+# give each node the same estimated work, pop_size=300 stack_size=100 trials cost far more than 100/50
+pairs = [(binary, trial) for binary in binariesToChange for trial in trials]
+costs = [trialCost(*getParams(binary)[:2]) for binary, trial in pairs]
+nodes, totals = lptSchedule(costs, len(doitFiles))
+
+for (binary, trial), node in zip(pairs, nodes):
+    # replace existing doit.slurm with new doit.slurm
+    dest = "/uufs/chpc.utah.edu/common/home/u1008557/" + sys.argv[-2] + "/" + binary + "/" + trial + "/doit.slurm"
+    os.remove(dest)
+    shutil.copy(doitFiles[node], dest)
 
-# print which binary is going to which node
-print("\nnotch272")
-print(notch272) 
-print("\nnotch273")
-print(notch273) 
-print("\nnotch274")
-print(notch274) 
+# print which trial is going to which node
+printSchedule([binary + "/" + trial for binary, trial in pairs], nodes, totals, ["notch272", "notch273", "notch274"])
 print("\n")
 
 
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput benchmark of result collection on synthetic study trees, see synthetic_study.py.
+
+For each size a synthetic t/binary/trial tree is built and collected twice by engine.run_study, each
+time in a fresh process: a cold run that unpickles every checkpoint and simplifies every model, and a
+warm run that reads the summary sidecars and the simplify cache. Reported are trials per second, the
+peak memory of the collecting process and of its workers, and the total time of each stage.
+The results can be saved and compared against a baseline, failing when throughput drops.
+
+    python benchmark.py [--sizes 100 1000 10000] [-j WORKERS] [--dir DIR] [--save FILE] [--baseline FILE]
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SIZES = (100, 1000, 10000)
+TOLERANCE = 0.2  # fraction of the baseline throughput a run may lose before it counts as a regression
+
+
+def peak_memory_mb(who):
+    """ :return: peak resident memory in MB of this process (resource.RUSAGE_SELF) or its waited children """
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10  # bytes on macOS, KB elsewhere
+
+
+def collect(root, workers=1, plot=False, simplify=True):
+    """
+    Collects a synthetic study in this process
+    :param root: study root written by synthetic_study.build_study
+    :param workers: number of processes collecting trials
+    :param plot: plot every trial, needs problems.beam_bending
+    :param simplify: simplify every model
+    :return: dict with trials, seconds, trials_per_second, peak_mb, worker_peak_mb and the total of each stage
+    """
+    import engine
+    import synthetic_study
+    import trial_summary
+    from timing import get_timer
+    trial_summary.load_archipelago = synthetic_study.load_synthetic  # workers are forked with the stand-in loader
+
+    study = engine.Study({'root': root, 'layout': 't/binary/trial', 'simplify': simplify,
+                          'plot': '{dir}/best_individual.png' if plot else None,
+                          'columns': [['t', 't'], ['binary', 'binary'], ['fitness', 'fitness'],
+                                      ['f(X_0)', 'expression']]})
+    start = time.perf_counter()
+    labels, rows, summaries = engine.run_study(study, workers)
+    seconds = time.perf_counter() - start
+    result = {'trials': len(labels), 'seconds': seconds, 'trials_per_second': len(labels) / seconds,
+              'peak_mb': peak_memory_mb(resource.RUSAGE_SELF),
+              'worker_peak_mb': peak_memory_mb(resource.RUSAGE_CHILDREN)}
+    result.update({'stage_' + row['stage']: row['total'] for row in get_timer().summary()})
+    return result
+
+
+def run_pass(root, workers, plot, simplify, cachePath):
+    """
+    Collects a synthetic study in a fresh process, so imports and peak memory are measured per run
+    :return: dict returned by collect
+    """
+    command = [sys.executable, os.path.abspath(__file__), '--collect', root, '-j', str(workers)]
+    command += ['--plot'] * plot + ['--no-simplify'] * (not simplify)
+    environment = dict(os.environ, SIMPLIFY_CACHE=cachePath)
+    output = subprocess.run(command, check=True, stdout=subprocess.PIPE, universal_newlines=True,
+                            env=environment).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def benchmark(sizes=SIZES, workers=1, plot=False, simplify=True, benchDir=None, population=100, nonpolynomial=None):
+    """
+    Builds and collects a synthetic study of every size
+    :param sizes: numbers of trials
+    :param benchDir: directory of the synthetic studies, a temporary directory removed afterwards if None
+    :param nonpolynomial: fraction of the distinct models that are not polynomials, see synthetic_study.py
+    :return: list of dicts with size, pass ('cold' or 'warm') and the results of collect
+    """
+    import synthetic_study
+    if nonpolynomial is None:
+        nonpolynomial = synthetic_study.NONPOLYNOMIAL
+    tempDir = tempfile.mkdtemp(prefix='bench_') if benchDir is None else None
+    benchDir = benchDir or tempDir
+    results = []
+    try:
+        for size in sizes:
+            root = os.path.join(benchDir, 'synthetic_{0}'.format(size)) + os.sep
+            shutil.rmtree(root, ignore_errors=True)
+            start = time.perf_counter()
+            synthetic_study.build_study(root, size, population, nonpolynomial=nonpolynomial)
+            print('built {0} trials in {1:.1f} s'.format(size, time.perf_counter() - start), file=sys.stderr)
+            cachePath = os.path.join(root, 'simplify_cache.sqlite')
+            for name in ('cold', 'warm'):
+                result = run_pass(root, workers, plot, simplify, cachePath)
+                results.append(dict(result, size=size, run=name))
+    finally:
+        if tempDir is not None:
+            shutil.rmtree(tempDir, ignore_errors=True)
+    return results
+
+
+def regressions(results, baseline, tolerance=TOLERANCE):
+    """
+    :param results: results of benchmark
+    :param baseline: results of an earlier benchmark
+    :param tolerance: fraction of the baseline throughput a run may lose
+    :return: list of (size, run, throughput, baseline throughput) of the runs that got slower
+    """
+    before = {(row['size'], row['run']): row['trials_per_second'] for row in baseline}
+    return [(row['size'], row['run'], row['trials_per_second'], before[row['size'], row['run']])
+            for row in results if (row['size'], row['run']) in before
+            and row['trials_per_second'] < (1 - tolerance) * before[row['size'], row['run']]]
+
+
+def print_results(results):
+    stages = sorted({key for row in results for key in row if key.startswith('stage_')})
+    print('{0:>7} {1:>5} {2:>9} {3:>9} {4:>9} {5:>10}'.format('trials', 'run', 'seconds', 'trials/s', 'peak MB',
+                                                              'worker MB')
+          + ''.join(' {0:>10}'.format(stage[len('stage_'):]) for stage in stages))
+    for row in results:
+        print('{trials:7d} {run:>5} {seconds:9.2f} {trials_per_second:9.1f} {peak_mb:9.1f} {worker_peak_mb:10.1f}'
+              .format(**row) + ''.join(' {0:10.2f}'.format(row.get(stage, 0.)) for stage in stages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark result collection on synthetic study trees")
+    parser.add_argument("--sizes", type=int, nargs='+', default=SIZES, help="numbers of trials")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="number of processes collecting trials in parallel (0 uses every core)")
+    parser.add_argument("--plot", action="store_true", help="plot every trial, needs problems.beam_bending")
+    parser.add_argument("--no-simplify", action="store_true", help="skip the simplification")
+    parser.add_argument("--population", type=int, default=100, help="individuals per synthetic archipelago")
+    parser.add_argument("--dir", help="directory of the synthetic studies, kept afterwards")
+    parser.add_argument("--save", help="write the results to this .json file")
+    parser.add_argument("--nonpolynomial", type=float,
+                        help="fraction of the distinct models that are not polynomials, simplified by sympy")
+    parser.add_argument("--baseline", help="fail if trials/s dropped more than {0:.0f}%% from this .json file"
+                        .format(100 * TOLERANCE))
+    parser.add_argument("--collect", metavar="ROOT", help=argparse.SUPPRESS)  # one run, used by run_pass
+    args = parser.parse_args()
+
+    if args.collect:
+        print(json.dumps(collect(args.collect, args.workers, args.plot, not args.no_simplify)))
+        return
+
+    results = benchmark(args.sizes, args.workers, args.plot, not args.no_simplify, args.dir, args.population,
+                        args.nonpolynomial)
+    print_results(results)
+    if args.save:
+        with open(args.save, 'w') as saveFile:
+            json.dump(results, saveFile, indent=1)
+    if args.baseline:
+        with open(args.baseline) as baselineFile:
+            slower = regressions(results, json.load(baselineFile))
+        for size, run, throughput, before in slower:
+            print('regression: {0} trials {1}: {2:.1f} trials/s, baseline {3:.1f}'.format(size, run, throughput, before))
+        if slower:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+"""
+Tokenizer and recursive descent parser for the infix strings BINGO prints for its models, i.e.
+    (X_0 + -10.000000148238323)((X_0)/(-4799.999951370799) )
+
+The parser builds an expression tree directly, without rewriting the string for sympy first.
+The tree can be converted into a sympy expression, evaluated with NumPy, multiplied out into
+polynomial coefficients, or written in a canonical form that is the same for every spelling of a model.
+
+Grammar (juxtaposition such as ")(" is multiplication, "^" is right associative):
+    expr    := term (('+' | '-') term)*
+    term    := unary (('*' | '/') unary | power)*     the power of an implicit product starts with '('
+    unary   := '-' unary | power
+    power   := primary ('^' unary)?
+    primary := NUMBER | NAME | NAME '(' expr ')' | '(' expr ')'
+"""
+
+import hashlib
+import re
+
+import numpy as np
+from polynomial_fit import MAX_DEGREE
+
+TOKEN_PATTERN = re.compile(r"\s*(?:(\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)|([A-Za-z_][A-Za-z_0-9]*)|(.))")
+OPERATORS = '+-*/^()'
+
+# functions BINGO can print, with their NumPy implementation
+NUMPY_FUNCTIONS = {'sin': np.sin, 'cos': np.cos, 'exp': np.exp, 'log': np.log, 'abs': np.abs,
+                   'sqrt': np.sqrt, 'sinh': np.sinh, 'cosh': np.cosh}
+NUMBER_NAMES = {'nan': np.nan, 'inf': np.inf}
+CANONICAL_DIGITS = 12  # significant digits of the constants in the canonical form
+
+
+class BingoParseError(ValueError):
+    """ Raised when a string is not a valid BINGO expression """
+
+
+class NotPolynomialError(ValueError):
+    """ Raised when an expression tree can not be written as a polynomial """
+
+
+def tokenize(expression):
+    """
+    Splits a BINGO expression into tokens
+    :param expression: String expression from BINGO
+    :return: list of (kind, text) tuples. kind is 'number', 'name' or the operator itself
+    """
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = TOKEN_PATTERN.match(expression, position)
+        number, name, operator = match.groups()
+        if number is not None:
+            tokens.append(('number', number))
+        elif name is not None:
+            tokens.append(('name', name))
+        elif operator in OPERATORS:
+            tokens.append((operator, operator))
+        else:
+            raise BingoParseError("Unexpected character {0!r} at position {1} of {2}"
+                                  .format(operator, match.start(3), expression))
+        position = match.end()
+    return tokens
+
+
+class Node:
+    """
+    Node of an expression tree.
+    op is 'number', 'name', 'neg', one of '+-*/^' or the name of a function. Numbers and names keep
+    their text in 'value', every other node keeps its operands in 'args'.
+    """
+
+    __slots__ = ('op', 'args', 'value')
+
+    def __init__(self, op, args=(), value=None):
+        self.op = op
+        self.args = tuple(args)
+        self.value = value
+
+    def __repr__(self):
+        if self.args:
+            return "Node({0!r}, {1!r})".format(self.op, list(self.args))
+        return "Node({0!r}, value={1!r})".format(self.op, self.value)
+
+    def variables(self):
+        """ :return: set of the variable names used in the tree """
+        if self.op == 'name':
+            return set() if self.value in NUMBER_NAMES else {self.value}
+        found = set()
+        for arg in self.args:
+            found |= arg.variables()
+        return found
+
+    def to_sympy(self, names=None):
+        """
+        Converts the tree into a sympy expression
+        :param names: optional dict renaming variables, i.e. {'X_0': 'x'}
+        :return: sympy expression
+        """
+        import sympy
+        names = names or {}
+        functions = {'sin': sympy.sin, 'cos': sympy.cos, 'exp': sympy.exp, 'log': sympy.log,
+                     'abs': sympy.Abs, 'sqrt': sympy.sqrt, 'sinh': sympy.sinh, 'cosh': sympy.cosh}
+
+        def convert(node):
+            if node.op == 'number':
+                if re.fullmatch(r'-?\d+', node.value):
+                    return sympy.Integer(node.value)
+                return sympy.Float(node.value)
+            if node.op == 'name':
+                if node.value in NUMBER_NAMES:
+                    return sympy.nan if node.value == 'nan' else sympy.oo
+                return sympy.Symbol(names.get(node.value, node.value))
+            args = [convert(arg) for arg in node.args]
+            if node.op == 'neg':
+                return -args[0]
+            if node.op == '+':
+                return args[0] + args[1]
+            if node.op == '-':
+                return args[0] - args[1]
+            if node.op == '*':
+                return args[0] * args[1]
+            if node.op == '/':
+                return args[0] / args[1]
+            if node.op == '^':
+                return args[0] ** args[1]
+            return functions[node.op](args[0])
+
+        return convert(self)
+
+    def evaluate(self, x):
+        """
+        Evaluates the tree with NumPy
+        :param x: array of shape [n, dims] (or [n] for a single variable). Column i is X_i
+        :return: 1-D array of n values
+        """
+        x = np.asarray(x, dtype=float)
+        if x.ndim == 1:
+            x = x.reshape([-1, 1])
+
+        # numpy scalars, so that constant subtrees divide by zero under errstate like the arrays do
+        def value_of(node):
+            if node.op == 'number':
+                return np.float64(node.value)
+            if node.op == 'name':
+                if node.value in NUMBER_NAMES:
+                    return np.float64(NUMBER_NAMES[node.value])
+                match = re.fullmatch(r'[Xx](?:_(\d+))?', node.value)
+                if match is None:
+                    raise BingoParseError("Unknown variable " + node.value)
+                return x[:, int(match.group(1) or 0)]
+            args = [value_of(arg) for arg in node.args]
+            if node.op == 'neg':
+                return -args[0]
+            if node.op == '+':
+                return args[0] + args[1]
+            if node.op == '-':
+                return args[0] - args[1]
+            if node.op == '*':
+                return args[0] * args[1]
+            if node.op == '/':
+                return args[0] / args[1]
+            if node.op == '^':
+                return np.power(args[0], args[1])
+            return NUMPY_FUNCTIONS[node.op](args[0])
+
+        with np.errstate(all='ignore'):
+            return np.broadcast_to(value_of(self), (x.shape[0],)).copy()
+
+    def canonical(self, digits=CANONICAL_DIGITS):
+        """
+        Canonical form of the tree. The operands of + and * are flattened and sorted, a - b is a + (-b),
+        signs are pulled out of products and quotients, and constants are rounded to digits significant
+        digits, so models that only differ in parenthesization, operand order or the last digits of their
+        constants have the same canonical form.
+        :param digits: significant digits of the constants
+        :return: String
+        """
+        def chain(node, op):
+            """ operands of a chain of + or *, with a flag for the operands subtracted """
+            if node.op == op or (op == '+' and node.op == '-'):
+                left, right = node.args
+                rights = chain(right, op) if node.op == op else [(not negated, operand)
+                                                                 for negated, operand in chain(right, op)]
+                return chain(left, op) + rights
+            return [(False, node)]
+
+        def signed(node, negate=False):
+            """ :return: sign and canonical magnitude of the node """
+            if node.op == 'number':
+                value = float(node.value)
+                if value != value:
+                    return False, 'nan'
+                return negate != (value < 0), '{0:.{1}g}'.format(abs(value), digits)
+            if node.op == 'name':
+                return negate, node.value
+            if node.op == 'neg':
+                return signed(node.args[0], not negate)
+            if node.op in ('+', '-'):
+                terms = [signed(operand, negate != negated) for negated, operand in chain(node, '+')]
+                return False, '+(' + ','.join(sorted(('-' if sign else '') + text for sign, text in terms)) + ')'
+            if node.op == '*':
+                factors = [signed(operand) for negated, operand in chain(node, '*')]
+                sign = sum(factor_sign for factor_sign, text in factors) % 2 == 1
+                return negate != sign, '*(' + ','.join(sorted(text for factor_sign, text in factors)) + ')'
+            if node.op == '/':
+                (sign_a, a), (sign_b, b) = signed(node.args[0]), signed(node.args[1])
+                return negate != (sign_a != sign_b), '/(' + a + ',' + b + ')'
+            return negate, node.op + '(' + ','.join(full(arg) for arg in node.args) + ')'
+
+        def full(node):
+            sign, text = signed(node)
+            return ('-' if sign else '') + text
+
+        return full(self)
+
+    def to_polynomial(self, variable='X_0'):
+        """
+        Multiplies the tree out into a polynomial of a single variable
+        :param variable: name of the variable
+        :return: numpy.polynomial.Polynomial
+        :raises NotPolynomialError: if the tree uses other variables, divides by the variable,
+                                    or raises it to anything but a constant integer from 0 to MAX_DEGREE
+
+        >>> parse_bingo('(X_0)(X_0 - 2.0)').to_polynomial().coef.tolist()
+        [0.0, -2.0, 1.0]
+        >>> parse_bingo('(X_0)^((-2.07)^(-2.07))').to_polynomial()
+        Traceback (most recent call last):
+        bingo_parser.NotPolynomialError: Exponent nan is not an integer from 0 to 8
+        >>> parse_bingo('(X_0)^((10.0)^(400.0))').to_polynomial()
+        Traceback (most recent call last):
+        bingo_parser.NotPolynomialError: Exponent inf is not an integer from 0 to 8
+        >>> parse_bingo('(X_0)^(150.0)').to_polynomial()
+        Traceback (most recent call last):
+        bingo_parser.NotPolynomialError: Exponent 150.0 is not an integer from 0 to 8
+        """
+        Polynomial = np.polynomial.Polynomial
+
+        def constant(polynomial, what):
+            coefficients = polynomial.trim().coef
+            if len(coefficients) > 1:
+                raise NotPolynomialError(what + " depends on " + variable)
+            return float(coefficients[0])
+
+        def convert(node):
+            if node.op == 'number':
+                return Polynomial([float(node.value)])
+            if node.op == 'name':
+                if node.value in NUMBER_NAMES:
+                    return Polynomial([NUMBER_NAMES[node.value]])
+                if node.value != variable:
+                    raise NotPolynomialError("Unexpected variable " + node.value)
+                return Polynomial([0., 1.])
+            args = [convert(arg) for arg in node.args]
+            if node.op == 'neg':
+                return -args[0]
+            if node.op == '+':
+                return args[0] + args[1]
+            if node.op == '-':
+                return args[0] - args[1]
+            if node.op == '*':
+                return args[0] * args[1]
+            if node.op == '/':
+                return args[0] / constant(args[1], "Denominator")
+            if node.op == '^':
+                exponent = constant(args[1], "Exponent")
+                if len(args[0].trim().coef) == 1:
+                    with np.errstate(all='ignore'):
+                        return Polynomial([np.power(constant(args[0], "Base"), exponent)])
+                if not (0 <= exponent <= MAX_DEGREE and exponent == int(exponent)):  # false for nan as well
+                    raise NotPolynomialError("Exponent {0} is not an integer from 0 to {1}".format(exponent,
+                                                                                                MAX_DEGREE))
+                return args[0] ** int(exponent)
+            with np.errstate(all='ignore'):
+                return Polynomial([NUMPY_FUNCTIONS[node.op](constant(args[0], "Argument of " + node.op))])
+
+        return convert(self)
+
+
+class Parser:
+    """ Recursive descent parser over the tokens of one expression """
+
+    def __init__(self, expression):
+        """
+        :param expression: String expression from BINGO
+        """
+        self.expression = expression
+        self.tokens = tokenize(expression)
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position][0]
+        return None
+
+    def take(self, kind=None):
+        if self.position >= len(self.tokens):
+            raise BingoParseError("Unexpected end of " + self.expression)
+        token = self.tokens[self.position]
+        if kind is not None and token[0] != kind:
+            raise BingoParseError("Expected {0!r} but found {1!r} in {2}".format(kind, token[1], self.expression))
+        self.position += 1
+        return token
+
+    def parse(self):
+        """ :return: root Node of the expression """
+        node = self.expr()
+        if self.position != len(self.tokens):
+            raise BingoParseError("Unexpected {0!r} in {1}".format(self.tokens[self.position][1], self.expression))
+        return node
+
+    def expr(self):
+        node = self.term()
+        while self.peek() in ('+', '-'):
+            op = self.take()[0]
+            node = Node(op, (node, self.term()))
+        return node
+
+    def term(self):
+        node = self.unary()
+        while self.peek() in ('*', '/', '('):
+            if self.peek() == '(':  # implicit multiplication, i.e. (X_0)(X_0)
+                node = Node('*', (node, self.power()))
+            else:
+                op = self.take()[0]
+                node = Node(op, (node, self.unary()))
+        return node
+
+    def unary(self):
+        if self.peek() == '-':
+            self.take()
+            operand = self.unary()
+            if operand.op == 'number':  # fold the sign into the constant
+                value = operand.value[1:] if operand.value.startswith('-') else '-' + operand.value
+                return Node('number', value=value)
+            return Node('neg', (operand,))
+        return self.power()
+
+    def power(self):
+        node = self.primary()
+        if self.peek() == '^':
+            self.take()
+            node = Node('^', (node, self.unary()))
+        return node
+
+    def primary(self):
+        kind, text = self.take()
+        if kind == 'number':
+            return Node('number', value=text)
+        if kind == 'name':
+            if self.peek() == '(' and text in NUMPY_FUNCTIONS:
+                self.take('(')
+                node = Node(text, (self.expr(),))
+                self.take(')')
+                return node
+            return Node('name', value=text)
+        if kind == '(':
+            node = self.expr()
+            self.take(')')
+            return node
+        raise BingoParseError("Unexpected {0!r} in {1}".format(text, self.expression))
+
+
+def parse_bingo(expression):
+    """
+    Parses a BINGO expression string
+    :param expression: String expression from BINGO
+    :return: root Node of the expression tree
+    """
+    return Parser(expression).parse()
+
+
+def is_polynomial(expression):
+    """
+    Whether a model is a polynomial by its structure, so that a numeric fit of its samples is its exact form
+    :param expression: String expression from BINGO
+    :return: True if the expression multiplies out into a polynomial of at most one variable, see Node.to_polynomial
+    """
+    try:
+        tree = parse_bingo(expression)
+        variables = tree.variables()
+        if len(variables) > 1:
+            return False
+        tree.to_polynomial(variables.pop() if variables else 'X_0')
+    except (BingoParseError, NotPolynomialError):
+        return False
+    return True
+
+
+def canonical_hash(expression, digits=CANONICAL_DIGITS):
+    """
+    Hash of the canonical form of a model (see Node.canonical). Spellings of the same model have the same hash.
+    Strings that do not parse are hashed as they are.
+    :param expression: String expression from BINGO
+    :param digits: significant digits of the constants
+    :return: hex digest
+    """
+    try:
+        canonical = parse_bingo(expression).canonical(digits)
+    except BingoParseError:
+        canonical = expression
+    return hashlib.sha1(canonical.encode()).hexdigest()
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Index of the latest checkpoint of every trial in a study tree.
+
+One recursive os.scandir pass over the study root finds every trial, whatever the layout of the
+study is (binary/trial, t/binary/trial, t/trial or binary only). The latest checkpoint of a trial is
+the beam_bending_<generation>.pkl with the highest generation, not the last name a directory scan
+happens to return. The BINGO .log file of every trial is indexed as well. The index is saved as
+checkpoint_index.json in the study root, so collectors neither chdir into nor scan every trial directory.
+
+The saved index also keeps the mtime of every directory it read. The next index_study only stats a
+directory whose mtime is unchanged and reuses what was found in it: a new checkpoint or trial changes the
+mtime of its directory, a checkpoint overwritten under the same name does not change the index. A
+directory modified shortly before the last scan is read again, its mtime may not show later changes yet.
+"""
+
+import json
+import os
+import re
+import time
+
+CHECKPOINT_PATTERN = re.compile(r'beam_bending_(\d+)\.pkl')
+T_PATTERN = re.compile(r't(\d+)(.*)')  # training data directories, i.e. t4 or t4-new
+TRIAL_PATTERN = re.compile(r'trial(\d+)')
+SKIP_DIRS = {'plots', '__pycache__'}
+INDEX_NAME = 'checkpoint_index.json'
+INDEX_VERSION = 3
+RACY_SECONDS = 2  # mtime granularity of the file system, NFS has one second
+
+
+def checkpoint_generation(name):
+    """
+    :param name: file name, i.e. beam_bending_01000.pkl
+    :return: generation of the checkpoint, or None if the name is not a checkpoint
+    """
+    match = CHECKPOINT_PATTERN.fullmatch(name)
+    return None if match is None else int(match.group(1))
+
+
+def latest_checkpoint(names):
+    """
+    :param names: file names of a trial directory
+    :return: name of the checkpoint with the highest generation, or None if there is none
+    """
+    checkpoints = [(checkpoint_generation(name), name) for name in names if checkpoint_generation(name) is not None]
+    return max(checkpoints)[1] if checkpoints else None
+
+
+def trial_log(names):
+    """
+    :param names: file names of a trial directory
+    :return: name of the BINGO .log file of the trial, or None if there is none
+    """
+    logs = sorted(name for name in names if name.endswith('.log'))
+    return logs[-1] if logs else None
+
+
+def level_kind(name):
+    """ :return: 'trial', 't' or 'binary', the level of the study a directory name belongs to """
+    if TRIAL_PATTERN.fullmatch(name):
+        return 'trial'
+    if T_PATTERN.fullmatch(name):
+        return 't'
+    return 'binary'
+
+
+def t_order(t):
+    """ Sort key of training data directories, so t10 comes after t8 and t4-new after t4 """
+    match = T_PATTERN.fullmatch(t)
+    return (0, '') if match is None else (int(match.group(1)), match.group(2))
+
+
+def entry_layout(entry):
+    """ :return: levels of the study an index entry has, i.e. 'binary/trial' """
+    levels = [level for level in ('t', 'binary') if entry[level]]
+    if entry['trial'] is not None:
+        levels.append('trial')
+    return '/'.join(levels)
+
+
+class CheckpointIndex:
+    """ Trials of a study with their latest checkpoint, ordered by t, binary and trial """
+
+    def __init__(self, root, trials, dirs=None, scanned=None):
+        """
+        :param root: study root directory
+        :param trials: list of dicts with t, binary, trial (None without trial directories), dir
+                       (relative to root), pkl (None for a trial without checkpoint), generation and log
+        :param dirs: dict of every directory read (relative to root) with its mtime, subdirectories, pkl and log
+        :param scanned: time of the scan in ns since the epoch
+        """
+        self.root = root
+        self.dirs = dirs or {}
+        self.scanned = scanned
+        self.entries = sorted(trials, key=lambda e: (t_order(e['t']), e['binary'], -1 if e['trial'] is None else e['trial']))
+        layouts = [entry_layout(e) for e in self.entries]
+        self.layout = max(set(layouts), key=layouts.count) if layouts else ''  # i.e. 't/binary/trial'
+
+    def trials(self, t=None, binary=None):
+        """
+        :param t: only trials of this training data directory
+        :param binary: only trials of this binary
+        :return: index entries in study order
+        """
+        return [e for e in self.entries if (t is None or e['t'] == t) and (binary is None or e['binary'] == binary)]
+
+    def t_values(self):
+        """ :return: training data directories in study order """
+        return list(dict.fromkeys(e['t'] for e in self.entries))
+
+    def binaries(self, t=None):
+        """ :return: binaries in study order """
+        return list(dict.fromkeys(e['binary'] for e in self.trials(t)))
+
+    def directory(self, entry):
+        """ :return: absolute directory of an index entry """
+        return os.path.join(self.root, entry['dir'])
+
+    def checkpoint(self, entry):
+        """ :return: absolute path of the latest checkpoint of an index entry, or None if it has none """
+        return None if entry['pkl'] is None else os.path.join(self.root, entry['dir'], entry['pkl'])
+
+    def log(self, entry):
+        """ :return: absolute path of the .log file of an index entry, or None if it has none """
+        return None if entry['log'] is None else os.path.join(self.root, entry['dir'], entry['log'])
+
+    def save(self, indexPath=None):
+        """ Writes the index to checkpoint_index.json in the study root, or to indexPath """
+        indexPath = indexPath or os.path.join(self.root, INDEX_NAME)
+        tmp = indexPath + '.tmp'
+        with open(tmp, 'w') as indexFile:
+            json.dump({'version': INDEX_VERSION, 'root': self.root, 'layout': self.layout, 'scanned': self.scanned,
+                       'trials': self.entries, 'dirs': self.dirs}, indexFile, indent=1)
+        os.replace(tmp, indexPath)
+
+
+def scan_study(root, saved=None):
+    """
+    Indexes a study tree in one recursive scandir pass. Directories below a trial are not visited.
+    :param root: study root directory
+    :param saved: CheckpointIndex of an earlier scan, its directories are only read again if their mtime changed
+    :return: CheckpointIndex
+    """
+    trials, dirs = [], {}
+    scanned = time.time_ns()
+    known = {} if saved is None or saved.scanned is None else saved.dirs
+    racy = 0 if saved is None or saved.scanned is None else saved.scanned - RACY_SECONDS * 10 ** 9
+
+    def visit(path, parts):
+        relPath = os.path.relpath(path, root)
+        mtime = os.stat(path).st_mtime_ns
+        last = known.get(relPath)
+        if last is not None and last['mtime'] == mtime and mtime < racy:
+            subdirs, pkl, log = last['subdirs'], last['pkl'], last['log']
+        else:
+            names, subdirs = [], []
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS and not entry.name.startswith('.'):
+                            subdirs.append(entry.name)
+                    else:
+                        names.append(entry.name)
+            pkl, log = latest_checkpoint(names), trial_log(names)
+        dirs[relPath] = {'mtime': mtime, 'subdirs': subdirs, 'pkl': pkl, 'log': log}
+        isTrial = bool(parts) and parts[-1][0] == 'trial'
+        if pkl is not None or isTrial:
+            trials.append(index_entry(relPath, parts, pkl, log))
+        if not isTrial:
+            for name in subdirs:
+                visit(os.path.join(path, name), parts + [(level_kind(name), name)])
+
+    visit(root, [])
+    return CheckpointIndex(root, trials, dirs, scanned)
+
+
+def index_entry(relPath, parts, pkl, log=None):
+    """
+    :param relPath: trial directory relative to the study root
+    :param parts: list of (kind, name) of the directories from the root to the trial
+    :param pkl: name of the latest checkpoint, or None
+    :param log: name of the .log file, or None
+    :return: index entry of the trial
+    """
+    t = '/'.join(name for kind, name in parts if kind == 't')
+    binary = '/'.join(name for kind, name in parts if kind == 'binary')
+    trial = [int(TRIAL_PATTERN.fullmatch(name).group(1)) for kind, name in parts if kind == 'trial']
+    return {'t': t, 'binary': binary, 'trial': trial[-1] if trial else None, 'dir': relPath,
+            'pkl': pkl, 'generation': None if pkl is None else checkpoint_generation(pkl), 'log': log}
+
+
+def load_index(root, indexPath=None):
+    """
+    :param root: study root directory
+    :param indexPath: file path of the index, checkpoint_index.json in the study root by default
+    :return: the saved CheckpointIndex, or None if there is none
+    """
+    indexPath = indexPath or os.path.join(root, INDEX_NAME)
+    try:
+        with open(indexPath) as indexFile:
+            saved = json.load(indexFile)
+    except (OSError, ValueError):
+        return None
+    if saved.get('version') != INDEX_VERSION:
+        return None
+    return CheckpointIndex(root, saved['trials'], saved['dirs'], saved['scanned'])
+
+
+def index_study(root):
+    """
+    Scans a study tree and saves its index. Directories that did not change since the saved index are not read.
+    :param root: study root directory
+    :return: CheckpointIndex
+    """
+    index = scan_study(root, load_index(root))
+    index.save()
+    return index
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Convergence curves of every trial of a study, parsed from the BINGO .log files.
+
+The logs are memory mapped and scanned with one regular expression, so a log is never read into
+memory line by line. Each trial becomes a best-fitness-vs-generation curve. The curves of a study are
+saved together in one .npz as flat arrays with offsets, from which the generations and time needed
+to reach a fitness threshold are computed for all trials at once, without loading a single pickle.
+
+    python convergence.py <study root> [threshold ...]
+"""
+
+import mmap
+import os
+import re
+import sys
+
+import numpy as np
+from checkpoint_index import index_study
+
+# BINGO logs one line per report, i.e.
+#   Generation: 1000   Elapsed time: 12.3456   Best training fitness: 1.234e-05
+NUMBER = rb'([-+]?(?:\d+\.?\d*(?:[eE][-+]?\d+)?|nan|inf))'
+LOG_PATTERN = re.compile(rb'[Gg]eneration:?\s*(\d+)(?:[^\n]*?[Ee]lapsed time:?\s*' + NUMBER + rb')?[^\n]*?'
+                         rb'[Ff]itness[^:\n]*:\s*' + NUMBER)
+CURVES_NAME = 'convergence.npz'
+THRESHOLDS = (1e-4, 1e-6, 1e-7, 1e-10)
+
+
+def parse_log(logPath):
+    """
+    Reads the fitness history of one BINGO log
+    :param logPath: path to a .log file
+    :return: arrays of the generations, elapsed times (nan if not logged) and best fitness so far
+    """
+    with open(logPath, 'rb') as logFile:
+        if os.fstat(logFile.fileno()).st_size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+        with mmap.mmap(logFile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            matches = [match.groups() for match in LOG_PATTERN.finditer(data)]
+    if not matches:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+    generation, elapsed, fitness = zip(*matches)
+    elapsed = np.array([np.nan if e is None else float(e) for e in elapsed])
+    fitness = np.array(fitness, dtype=float)
+    fitness[np.isnan(fitness)] = np.inf
+    return np.array(generation, dtype=np.int64), elapsed, np.minimum.accumulate(fitness)
+
+
+class ConvergenceCurves:
+    """
+    Curves of many trials as flat arrays. The curve of trial i is [offsets[i], offsets[i + 1])
+    of generation, elapsed and fitness.
+    """
+
+    def __init__(self, labels, offsets, generation, elapsed, fitness):
+        """
+        :param labels: name of each trial, i.e. 't4/trial3'
+        :param offsets: start of each curve in the flat arrays, followed by their length
+        :param generation: generations of every curve
+        :param elapsed: elapsed times of every curve, nan if not logged
+        :param fitness: best fitness so far of every curve
+        """
+        self.labels = np.asarray(labels)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.generation = np.asarray(generation, dtype=np.int64)
+        self.elapsed = np.asarray(elapsed, dtype=float)
+        self.fitness = np.asarray(fitness, dtype=float)
+
+    def curve(self, i):
+        """ :return: generations, elapsed times and best fitness of trial i """
+        part = slice(self.offsets[i], self.offsets[i + 1])
+        return self.generation[part], self.elapsed[part], self.fitness[part]
+
+    def first_reached(self, threshold):
+        """
+        :param threshold: fitness threshold
+        :return: index into the flat arrays of the first point of each curve with fitness <= threshold,
+                 -1 for curves that never reach it
+        """
+        reached = np.flatnonzero(self.fitness <= threshold)
+        first = np.searchsorted(reached, self.offsets[:-1])  # first reached point at or after each start
+        first = np.where(first < len(reached), reached[np.minimum(first, len(reached) - 1)], -1)
+        return np.where((first >= 0) & (first < self.offsets[1:]), first, -1)
+
+    def time_to_threshold(self, threshold):
+        """
+        :param threshold: fitness threshold
+        :return: generations and elapsed times each trial needed to reach the threshold, nan if it never did
+        """
+        first = self.first_reached(threshold)
+        reached = first >= 0
+        generations = np.full(len(first), np.nan)
+        elapsed = np.full(len(first), np.nan)
+        generations[reached] = self.generation[first[reached]]
+        elapsed[reached] = self.elapsed[first[reached]]
+        return generations, elapsed
+
+    def final_fitness(self):
+        """ :return: best fitness at the end of each curve, nan for empty curves """
+        lengths = np.diff(self.offsets)
+        final = np.full(len(lengths), np.nan)
+        final[lengths > 0] = self.fitness[self.offsets[1:][lengths > 0] - 1]
+        return final
+
+    def statistics(self, thresholds=THRESHOLDS):
+        """
+        :param thresholds: fitness thresholds
+        :return: list of dicts per threshold with the fraction of trials reaching it and the
+                 median and 95th percentile of the generations and time they needed
+        """
+        rows = []
+        for threshold in thresholds:
+            generations, elapsed = self.time_to_threshold(threshold)
+            reached = ~np.isnan(generations)
+            row = {'threshold': threshold, 'trials': len(reached),
+                   'reached': float(np.mean(reached)) if len(reached) else 0.}
+            for name, values in (('generations', generations[reached]), ('time', elapsed[reached])):
+                values = values[~np.isnan(values)]
+                row[name + '_p50'] = float(np.median(values)) if len(values) else np.nan
+                row[name + '_p95'] = float(np.percentile(values, 95)) if len(values) else np.nan
+            rows.append(row)
+        return rows
+
+    def save(self, npzPath):
+        """ Saves the curves as one .npz """
+        np.savez_compressed(npzPath, labels=self.labels, offsets=self.offsets, generation=self.generation,
+                            elapsed=self.elapsed, fitness=self.fitness)
+
+
+def load_curves(npzPath):
+    """
+    :param npzPath: file path of a .npz written by ConvergenceCurves.save
+    :return: ConvergenceCurves
+    """
+    with np.load(npzPath) as data:
+        return ConvergenceCurves(data['labels'], data['offsets'], data['generation'], data['elapsed'], data['fitness'])
+
+
+def collect_curves(index):
+    """
+    Parses the log of every trial of a study
+    :param index: CheckpointIndex of the study
+    :return: ConvergenceCurves of the trials that have a log
+    """
+    labels, offsets, parts = [], [0], []
+    for entry in index.trials():
+        logPath = index.log(entry)
+        if logPath is None:
+            continue
+        curve = parse_log(logPath)
+        labels.append(entry['dir'])
+        offsets.append(offsets[-1] + len(curve[0]))
+        parts.append(curve)
+    if not parts:
+        return ConvergenceCurves([], [0], [], [], [])
+    generation, elapsed, fitness = (np.concatenate(arrays) for arrays in zip(*parts))
+    return ConvergenceCurves(labels, offsets, generation, elapsed, fitness)
+
+
+def main():
+    """ Saves convergence.npz in the study root and prints the time to reach each threshold """
+    studyRoot = sys.argv[1]
+    thresholds = [float(threshold) for threshold in sys.argv[2:]] or THRESHOLDS
+    curves = collect_curves(index_study(studyRoot))
+    curves.save(os.path.join(studyRoot, CURVES_NAME))
+    print('{0:>10} {1:>7} {2:>8} {3:>10} {4:>10} {5:>10} {6:>10}'.format(
+        'threshold', 'trials', 'reached', 'gen p50', 'gen p95', 'time p50', 'time p95'))
+    for row in curves.statistics(thresholds):
+        print('{threshold:10.1e} {trials:7d} {reached:8.1%} {generations_p50:10.0f} {generations_p95:10.0f} '
+              '{time_p50:10.1f} {time_p95:10.1f}'.format(**row))
+
+
+if __name__ == "__main__":
+    main()
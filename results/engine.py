@@ -0,0 +1,435 @@
+# -*- coding: utf-8 -*-
+"""
+One result collection engine for every study, driven by a study manifest.
+
+A study manifest is a JSON file (or dict) declaring where the study is, its layout, the beam bending
+problem, how models are simplified, where plots go and which csv columns and analyses are written:
+
+    {"study": "bnd_tdata", "root": "/uufs/chpc.utah.edu/common/home/u1008557/tests/bnd_tdata/",
+     "layout": "t/trial", "k": 5e-5, "rounding_num": 13, "zero_threshold": 1e-50, "variable": "x",
+     "csv": "results.csv", "columns": [["Training Data", "substr(t, 2)"], ["fitness", "fitness"]],
+     "success": "success.csv"}
+
+Every study is collected the same way: the checkpoint index finds the trials, summaries are cached
+next to the pickles, trials run in a process pool, an incremental run only processes new or changed
+checkpoints, each distinct model is simplified once for all trials that found it (see
+bingo_parser.canonical_hash), and the results go through the results store. Every stage is timed,
+see timing.py.
+
+Stages can be switched off from the command line. The heavy libraries are only imported by the stage
+that needs them: sympy by simplify, matplotlib and problems.beam_bending by plot and npz, and bingo
+only if a checkpoint has no summary yet. A check with --summary-only needs none of them.
+
+    python engine.py <study.json> [-j WORKERS] [--incremental] [--no-plot] [--no-simplify] [--summary-only]
+                     [--timings] [--profile DIR [--trace-memory]]
+"""
+
+import argparse
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+from bingo_parser import canonical_hash
+from checkpoint_index import index_study, entry_layout
+from manifest import Manifest, MANIFEST_NAME, is_current, pickle_entry
+from results_store import ResultsStore
+from timing import get_timer, configure_timer
+from trial_summary import load_trial_summary
+
+# keys of a study manifest and their defaults
+DEFAULTS = {
+    'study': None,  # name of the study in the results store
+    'root': None,  # study root directory
+    'layout': None,  # only trials of this layout, i.e. 'binary/trial', 't/binary/trial', 't/trial' or 'binary'
+    't': None,  # only these training data directories
+    'binaries': None,  # only these binaries
+    'k': 5.e-5,  # load constant of the beam bending problem
+    'L': 10.,  # length of the beam
+    'rounding_num': None,  # decimals of the simplified models
+    'zero_threshold': None,  # constants at or below this are zero
+    'variable': 'X_0',  # name of the variable in the simplified models
+    'plot': None,  # path template of the plot of each trial, None for no plots
+    'montage': None,  # path template of the grid of every trial of a binary, None for no montages
+    'clean_plots': False,  # recreate the directories of the plots unless the run is incremental
+    'simplify': True,  # simplify the best individuals, False writes them to the csv as they are
+    'time_budget': 60.,  # seconds a full sympy simplify may take on one model, None for no limit
+    'csv': 'Fitness_Data.csv',
+    'columns': [['binary', 'binary'], ['fitness', 'fitness'], ['generations', 'generations'],
+                ['f(X_0)', 'expression']],  # csv header and results store column or SQL expression
+    'npz': None,  # file of every model evaluated on the plotting grid, see evaluation.py
+    'effects': None,  # file of the ranked factorial effects, see factorial.py
+    'factors': None,  # factor names of the binary digits
+    'success': None,  # file of the success rates per t, see success.py
+    'load_hint': None,  # printed before exiting if a checkpoint can not be loaded
+}
+
+
+class Study:
+    """
+    Study manifest with defaults for every key left out.
+    Path templates may use {root}, {dir} (trial directory), {t}, {binary} and {trial}; other file names
+    are relative to the study root.
+    """
+
+    def __init__(self, config):
+        """
+        :param config: dict of study manifest keys
+        """
+        unknown = set(config) - set(DEFAULTS)
+        if unknown:
+            raise ValueError("Unknown study manifest keys: " + ", ".join(sorted(unknown)))
+        self.config = dict(DEFAULTS, **config)
+        if self.config['root'] is None:
+            raise ValueError("A study manifest needs a root")
+        if self.config['study'] is None:
+            self.config['study'] = os.path.basename(os.path.normpath(self.config['root']))
+
+    def __getattr__(self, key):
+        try:
+            return self.__dict__['config'][key]
+        except KeyError:
+            raise AttributeError(key)
+
+    def path(self, name):
+        """ :return: name relative to the study root, unless it is absolute """
+        return os.path.join(self.root, name)
+
+    def template(self, template, entry):
+        """ :return: path template filled in for an index entry """
+        return template.format(root=self.root, dir=os.path.join(self.root, entry['dir']), t=entry['t'],
+                               binary=entry['binary'], trial='' if entry['trial'] is None else entry['trial'])
+
+    def select(self, index):
+        """ :return: index entries of the trials of the study """
+        return [e for e in index.trials()
+                if (self.layout is None or entry_layout(e) == self.layout)
+                and (self.t is None or e['t'] in self.t)
+                and (self.binaries is None or e['binary'] in self.binaries)]
+
+
+def load_study(studyPath):
+    """
+    :param studyPath: file path of a study manifest
+    :return: Study
+    """
+    with open(studyPath) as studyFile:
+        return Study(json.load(studyFile))
+
+
+def trial_label(entry):
+    """ :return: name of a trial, i.e. '10101_1', 't4_3' or '10101' """
+    return "_".join(str(part) for part in (entry['t'], entry['binary'], entry['trial']) if part not in ('', None))
+
+
+def simplify_model(study, summary):
+    """
+    Simplifies the best individual of a trial
+    :param study: Study
+    :param summary: trial summary
+    :return: simplified model as a String, in the variable of the study, and whether it was simplified.
+             A model whose simplification ran out of time is returned as it is and not marked simplified
+    """
+    if study.simplify:
+        from simplification import simplify_trial  # imports sympy
+        model = simplify_trial(summary, study.rounding_num, study.zero_threshold, study.time_budget)
+        polynomial, simplified = str(model.result), not getattr(model, 'timed_out', False)
+    else:
+        polynomial, simplified = summary['best_individual'], False
+    if study.variable != 'X_0':
+        polynomial = polynomial.replace('X_0', study.variable)
+    return polynomial, simplified
+
+
+def result_row(study, entry, summary, polynomial):
+    """
+    Builds the row of a trial in the results store
+    :param study: Study
+    :param entry: index entry of the trial
+    :param summary: trial summary
+    :param polynomial: simplified model of the trial, see simplify_model
+    :return: dict of ResultsStore.add arguments
+    """
+    return {'t': entry['t'], 'binary': entry['binary'], 'trial': entry['trial'] or 0,
+            'fitness': summary['fitness'], 'complexity': summary['complexity'],
+            'generations': summary['generations'], 'expression': polynomial}
+
+
+def collect_trial(task):
+    """
+    Loads the summary of one trial and plots it. In montage mode the plot is left to plot_binary.
+    The model is simplified afterwards by simplify_group, once for every trial with the same model.
+    A trial whose manifest entry still matches its latest checkpoint is neither simplified nor plotted again.
+    Runs in the process pool workers as well.
+    :param task: tuple of (Study, index entry, latest checkpoint or None, manifest entry of the trial or None)
+    :return: the trial summary (None if the .pkl file is missing), the row and manifest entry of the last run
+             (None if the trial has to be simplified) and the stage timings of the trial
+    """
+    study, entry, beamBendingPkl, lastEntry = task
+    timer = get_timer()
+    label = trial_label(entry)
+    if beamBendingPkl is None:  # handles missing .pkl file
+        print('pkl file missing from ' + study.path(entry['dir']))
+        return None, None, None, timer.pop_records()
+    try:
+        with timer.stage('load', label):
+            summary = load_trial_summary(beamBendingPkl)  # the pickle is read at most once per trial
+    except Exception:
+        if study.load_hint is None:
+            raise
+        print(study.load_hint)
+        raise SystemExit(1)
+
+    plotPath = None if study.plot is None else study.template(study.plot, entry)
+    if (is_current(lastEntry, beamBendingPkl) and (plotPath is None or os.path.exists(plotPath))
+            and (lastEntry.get('simplified', True) or not study.simplify)):
+        return summary, lastEntry['row'], lastEntry, timer.pop_records()
+    if plotPath is not None:
+        with timer.stage('plot', label):
+            from plotting import plot_best_individual  # needs problems.beam_bending on the PYTHONPATH
+            plot_best_individual(summary, plotPath, study.k, study.L)
+    return summary, None, None, timer.pop_records()
+
+
+def simplify_group(task):
+    """
+    Simplifies one distinct model. Runs in the process pool workers as well.
+    :param task: tuple of (Study, label of the first trial with the model, its summary)
+    :return: simplified model, whether it was simplified and the stage timings
+    """
+    study, label, summary = task
+    timer = get_timer()
+    with timer.stage('simplify' if study.simplify else 'row', label, summary['best_individual']):
+        polynomial, simplified = simplify_model(study, summary)
+    return polynomial, simplified, timer.pop_records()
+
+
+def plot_binary(task):
+    """
+    Plots every trial of a binary as one grid. Runs in the process pool workers as well.
+    :param task: tuple of (Study, montage path, trial summaries, trial labels)
+    :return: stage timings of the montage
+    """
+    study, montagePath, summaries, labels = task
+    timer = get_timer()
+    with timer.stage('montage', os.path.basename(montagePath)):
+        from plotting import plot_montage
+        plot_montage(summaries, labels, montagePath, study.k, study.L)
+    return timer.pop_records()
+
+
+def create_plots_dir(plotsPath):
+    """
+    Creates a new plots directory.
+    Removes and recreates the directory if it already exists.
+    """
+    if os.path.isdir(plotsPath):
+        shutil.rmtree(plotsPath)
+    os.mkdir(plotsPath)
+
+
+def prepare_plot_dirs(study, entries, incremental):
+    """ Creates the directories of every plot and montage, recreating them if the study cleans its plots """
+    directories = {os.path.dirname(study.template(template, entry))
+                   for template in (study.plot, study.montage) if template is not None for entry in entries}
+    for directory in sorted(directories):
+        if study.clean_plots and not incremental:
+            create_plots_dir(directory)
+        else:
+            os.makedirs(directory, exist_ok=True)
+
+
+def run_study(study, workers=1, incremental=False):
+    """
+    Collects every trial of a study, writes the results store and csv, and runs the analyses the study declares
+    :param study: Study
+    :param workers: number of processes collecting trials, 0 uses every core
+    :param incremental: keep the results of the last run and only process new or changed checkpoints
+    :return: labels, rows and summaries of every trial in study order
+    """
+    timer = get_timer()
+    with timer.stage('index', study.study):
+        index = index_study(study.root)  # one pass over the study finds every trial and its latest checkpoint
+    entries = study.select(index)
+    labels = [trial_label(entry) for entry in entries]
+    manifest = Manifest(study.path(MANIFEST_NAME)) if incremental else None
+    prepare_plot_dirs(study, entries, incremental)
+
+    tasks = [(study, entry, index.checkpoint(entry), None if manifest is None else manifest.get(label))
+             for entry, label in zip(entries, labels)]
+    workers = workers or os.cpu_count()
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=configure_timer) if workers > 1 else None
+    try:
+        mapper = map if pool is None else pool.map
+        results = []
+        for summary, row, entry, records in mapper(collect_trial, tasks):  # results come back in study order
+            results.append([row, summary, entry])
+            timer.add(records)
+
+        # trials converge to the same model in different spellings, simplify each distinct model once.
+        # Without simplification every trial keeps its own string
+        groups = {}
+        for i, (row, summary, entry) in enumerate(results):
+            if summary is not None and row is None:
+                groups.setdefault(canonical_hash(summary['best_individual']) if study.simplify else i, []).append(i)
+        models = [(study, labels[trials[0]], results[trials[0]][1]) for trials in groups.values()]
+        for trials, (polynomial, simplified, records) in zip(groups.values(), mapper(simplify_group, models)):
+            timer.add(records)
+            for i in trials:
+                row = result_row(study, entries[i], results[i][1], polynomial)
+                results[i][0] = row
+                # a timed out model is simplified again by the next incremental run
+                results[i][2] = dict(pickle_entry(tasks[i][2], row), simplified=simplified)
+
+        # montages of the binaries with a new or changed trial
+        montages, changed = {}, set()
+        for task, label, (row, summary, entry) in zip(tasks, labels, results):
+            if study.montage is not None:
+                montagePath = study.template(study.montage, task[1])
+                montages.setdefault(montagePath, ([], []))
+                montages[montagePath][0].append(summary)
+                montages[montagePath][1].append(label)
+                if entry != task[3]:
+                    changed.add(montagePath)
+            if manifest is not None:
+                manifest.update(label, entry)
+        plots = [(study, montagePath, summaries, montageLabels)
+                 for montagePath, (summaries, montageLabels) in montages.items()
+                 if manifest is None or montagePath in changed or not os.path.exists(montagePath)]
+        for records in mapper(plot_binary, plots):
+            timer.add(records)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    rows = [row for row, summary, entry in results]
+    summaries = [summary for row, summary, entry in results]
+    write_results(study, rows)
+    if manifest is not None:
+        manifest.save()
+
+    # evaluate every model on one grid for downstream plotting and error analysis
+    if study.npz is not None:
+        with timer.stage('npz', study.study):
+            from evaluation import save_evaluations
+            save_evaluations(study.path(study.npz), labels, summaries, study.k, study.L)
+    return labels, rows, summaries
+
+
+def write_results(study, rows):
+    """
+    Rewrites the study in the results store with every row in study order, exports its csv and runs its analyses.
+    Rows of unchanged trials of an incremental run come from the manifest.
+    :param study: Study
+    :param rows: rows of every trial, None for missing trials
+    """
+    timer = get_timer()
+    with timer.stage('store', study.study):
+        with ResultsStore(study.path("results.sqlite"), study.study) as store:
+            store.clear()
+            for row in rows:
+                if row is not None:
+                    store.add(**row)
+            store.export_csv(study.path(study.csv), study.columns)
+            runs = store.select('t, binary, fitness', 'fitness IS NOT NULL')
+
+    if study.effects is not None and runs:
+        with timer.stage('effects', study.study):
+            from factorial import factorial_effects, write_effects
+            t, binaries, fitness = zip(*runs)
+            write_effects(study.path(study.effects), factorial_effects(binaries, fitness, study.factors))
+    if study.success is not None and runs:
+        with timer.stage('success', study.study):
+            from success import success_table, write_success
+            t, binaries, fitness = zip(*runs)
+            write_success(study.path(study.success), success_table(t, fitness))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect the results of a study")
+    parser.add_argument("study", help="file path of the study manifest (.json)")
+    add_collection_arguments(parser)
+    args = parser.parse_args()
+    collect_study(load_study(args.study), args)
+
+
+def add_collection_arguments(parser):
+    """ Adds the options every collection command line has: workers, incremental, stages and timings """
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="number of processes collecting trials in parallel (0 uses every core)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="keep the csv and plots of the last run and only process new or changed checkpoints")
+    add_stage_arguments(parser)
+    add_timing_arguments(parser)
+
+
+def collect_study(study, args):
+    """
+    Runs a study with the options parsed by add_collection_arguments
+    :param study: Study
+    :param args: parsed options
+    :return: see run_study
+    """
+    return run_timed(select_stages(study, args), args.workers, args.incremental, args)
+
+
+def add_stage_arguments(parser):
+    """ Adds the options switching stages off to a collection command line """
+    parser.add_argument("--no-plot", action="store_true",
+                        help="skip the plots, montages and models.npz, matplotlib and problems.beam_bending are not needed")
+    parser.add_argument("--no-simplify", action="store_true",
+                        help="write the best individuals to the csv without simplifying them, sympy is not needed")
+    parser.add_argument("--summary-only", action="store_true",
+                        help="only read the checkpoint summaries and write the csv, implies --no-plot and --no-simplify "
+                             "and skips the analyses")
+
+
+def select_stages(study, args):
+    """
+    :param study: Study
+    :param args: options parsed by add_stage_arguments
+    :return: Study with the stages switched off by the options removed
+    """
+    config = dict(study.config)
+    if args.no_plot or args.summary_only:
+        config.update(plot=None, montage=None, npz=None)
+    if args.no_simplify or args.summary_only:
+        config['simplify'] = False
+    if args.summary_only:
+        config.update(effects=None, success=None)
+    return Study(config)
+
+
+def add_timing_arguments(parser):
+    """ Adds the timing and profiling options to a collection command line """
+    parser.add_argument("--timings", action="store_true",
+                        help="print count, total, p50, p95 and max of every stage and its slowest trial")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="write a cProfile profile of every stage and the slowest trials to DIR. "
+                             "Collects the trials in this process")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="record the peak memory of every stage with tracemalloc, written to the --profile DIR. "
+                             "Needs --profile")
+
+
+def run_timed(study, workers, incremental, args):
+    """
+    Runs a study with the timing options parsed by add_timing_arguments.
+    Profiles are collected in this process, so profiling runs the trials serially.
+    """
+    if args.trace_memory and not args.profile:
+        raise SystemExit("--trace-memory writes its snapshots to the --profile DIR, give --profile as well")
+    if args.profile:
+        configure_timer(profile=True, trace_memory=args.trace_memory)
+        workers = 1
+    result = run_study(study, workers, incremental)
+    timer = get_timer()
+    if args.timings or args.profile:
+        print(timer.report())
+    if args.profile:
+        timer.dump(args.profile)
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Shared evaluation grid and batched evaluation of best individuals.
+
+The grid, the analytic solution on it and the training points only depend on (k, L, n_points),
+so they are computed once per process. The batch stage evaluates the best individual of every
+trial on the grid into one 2-D array and saves it as .npz, so that plots and error analysis can
+be made from that file without opening a single pickle.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+from problems.beam_bending import analytic_solution
+from bingo_parser import parse_bingo
+import trial_summary
+
+N_TRAINING = 5  # training points of the beam bending problem
+
+
+class EvaluationContext:
+    """ Grid, analytic solution and training data of one beam bending problem """
+
+    def __init__(self, k, L=10., n_points=64, n_training=N_TRAINING):
+        """
+        :param k: load constant of the beam bending problem
+        :param L: length of the beam
+        :param n_points: number of grid points
+        :param n_training: number of training points
+        """
+        self.k = k
+        self.L = L
+        self.n_points = n_points
+        self.x = np.linspace(0., L, n_points)
+        self.analytic = analytic_solution(self.x, k, L)
+        self.x_training = np.linspace(0., L, n_training)
+        self.y_training = analytic_solution(self.x_training, k, L)
+
+
+@lru_cache(maxsize=None)
+def get_context(k, L=10., n_points=64):
+    """ :return: the EvaluationContext of this process for (k, L, n_points) """
+    return EvaluationContext(k, L, n_points)
+
+
+def evaluate_summary(summary, context):
+    """
+    Evaluates the best individual of one trial on the grid of a context
+    :param summary: trial summary (see trial_summary.py), None for a trial without a .pkl file
+    :param context: EvaluationContext
+    :return: 1-D array of n_points values, nan for a missing trial
+    """
+    if summary is None:
+        return np.full(context.n_points, np.nan)
+    if context.L == trial_summary.L and context.n_points == trial_summary.N_POINTS:
+        return np.array(summary['curve'], dtype=float)  # already evaluated on this grid
+    return parse_bingo(summary['best_individual']).evaluate(context.x)
+
+
+def evaluate_summaries(summaries, context):
+    """
+    Evaluates the best individuals of many trials on the grid of a context
+    :param summaries: list of trial summaries
+    :param context: EvaluationContext
+    :return: array of shape [n_trials, n_points]
+    """
+    models = np.empty((len(summaries), context.n_points))
+    for i, summary in enumerate(summaries):
+        models[i] = evaluate_summary(summary, context)
+    return models
+
+
+def save_evaluations(npzPath, labels, summaries, k, L=10., n_points=64):
+    """
+    Evaluates every trial on the shared grid and saves the results as one .npz file
+    The file holds x, analytic, x_training, y_training, labels, fitness, generations and models,
+    where models[i] is the best individual of trial labels[i] evaluated on x.
+    :param npzPath: file path of the .npz
+    :param labels: name of each trial, i.e. '00101_3'
+    :param summaries: trial summaries in the order of labels
+    :param k: load constant of the beam bending problem
+    :param L: length of the beam
+    :param n_points: number of grid points
+    """
+    context = get_context(k, L, n_points)
+    fitness = [np.nan if s is None else s['fitness'] for s in summaries]
+    generations = [-1 if s is None else s['generations'] for s in summaries]
+    np.savez_compressed(npzPath, k=k, L=L, x=context.x, analytic=context.analytic,
+                        x_training=context.x_training, y_training=context.y_training,
+                        labels=np.array(labels), fitness=np.array(fitness, dtype=float),
+                        generations=np.array(generations), models=evaluate_summaries(summaries, context))
+
+
+def load_evaluations(npzPath):
+    """
+    :param npzPath: file path of a .npz written by save_evaluations
+    :return: dict of the arrays in the file
+    """
+    with np.load(npzPath) as data:
+        return {key: data[key] for key in data.files}
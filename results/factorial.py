@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Main and interaction effects of the two level hyperparameter studies.
+
+The binary test directory names are the design, i.e. '10110' runs factor 1, 3 and 4 at their high
+level. They are decoded into a -1/+1 factor matrix and every main and interaction effect on
+log10(fitness) is estimated at once by least squares on the model matrix, which gives the Yates
+effects for a balanced design and still works with replicates or missing runs. Confidence intervals
+use the residual error when there are replicates, and Lenth's pseudo standard error for an
+unreplicated design.
+
+A fractional design, or a full one with missing runs, can not estimate every term. Terms are taken
+main effects first and a term whose column depends on the columns taken before it is not fitted: it
+is aliased with them, i.e. the interaction pop*stack*dif*cross*mut with the intercept of a 2^(5-1)
+design. Each ranked effect lists the terms it is aliased with, it estimates their sum.
+
+    python factorial.py <results.sqlite> <study> [factor name ...]
+"""
+
+import csv
+import itertools
+import sys
+from statistics import NormalDist
+
+import numpy as np
+from results_store import ResultsStore
+
+FITNESS_FLOOR = 1e-16  # fitness of exact models, log10(0) would be -inf
+
+
+def factor_matrix(binaries):
+    """
+    :param binaries: binary test directory names of equal length, one per run
+    :return: array of shape [runs, factors], -1 for the low and +1 for the high level
+    """
+    digits = np.array([list(binary) for binary in binaries], dtype=int)
+    return 2 * digits - 1
+
+
+def effect_terms(n_factors, max_order=None):
+    """
+    :param n_factors: number of factors
+    :param max_order: highest interaction order, None for all
+    :return: tuples of factor indices, main effects first, i.e. (0,), (1,), ..., (0, 1), ...
+    """
+    max_order = n_factors if max_order is None else max_order
+    return [term for order in range(1, max_order + 1) for term in itertools.combinations(range(n_factors), order)]
+
+
+def model_matrix(factors, terms):
+    """
+    :param factors: factor matrix of shape [runs, factors]
+    :param terms: effect terms
+    :return: array of shape [runs, 1 + terms] with the intercept column first
+    """
+    columns = [np.ones(len(factors))] + [np.prod(factors[:, list(term)], axis=1) for term in terms]
+    return np.column_stack(columns)
+
+
+def estimable_terms(X, tol=1e-9):
+    """
+    Picks the columns of a model matrix that are linearly independent of the columns before them
+    :param X: model matrix with the intercept column first
+    :param tol: relative size of the part of a column outside the span of the columns before it
+    :return: indices of the estimable columns, always including the intercept, and of the aliased ones
+    """
+    kept, aliased = [0], []
+    for column in range(1, X.shape[1]):
+        basis = X[:, kept]
+        outside = X[:, column] - basis @ np.linalg.lstsq(basis, X[:, column], rcond=None)[0]
+        if np.linalg.norm(outside) > tol * np.linalg.norm(X[:, column]):
+            kept.append(column)
+        else:
+            aliased.append(column)
+    return kept, aliased
+
+
+def alias_text(coefficients, labels, tol=1e-8):
+    """
+    :param coefficients: alias coefficient of each aliased term on one estimated term
+    :param labels: name of each aliased term
+    :return: i.e. '+stack*dif*cross*mut -0.25 pop*mut', '' if it has no aliases
+    """
+    parts = []
+    for coefficient, label in zip(coefficients, labels):
+        if abs(coefficient) <= tol:
+            continue
+        if abs(abs(coefficient) - 1) <= tol:
+            parts.append(('+' if coefficient > 0 else '-') + label)
+        else:
+            parts.append('{0:+.3g} {1}'.format(coefficient, label))
+    return ' '.join(parts)
+
+
+def t_quantile(p, dof):
+    """
+    Quantile of Student's t distribution from the Cornish-Fisher expansion around the normal quantile.
+    Accurate to about 1e-3 for dof >= 3, which is all the confidence intervals need.
+    :param p: probability
+    :param dof: degrees of freedom
+    :return: quantile
+    """
+    z = NormalDist().inv_cdf(p)
+    g = [(z ** 3 + z) / 4,
+         (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96,
+         (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384,
+         (79 * z ** 9 + 779 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160]
+    return z + sum(gi / dof ** (i + 1) for i, gi in enumerate(g))
+
+
+def lenth_pse(effects):
+    """
+    Lenth's pseudo standard error of the effects of an unreplicated design
+    :param effects: estimated effects
+    :return: pseudo standard error and its degrees of freedom
+    """
+    magnitude = np.abs(effects)
+    s0 = 1.5 * np.median(magnitude)
+    small = magnitude[magnitude < 2.5 * s0]
+    pse = 1.5 * np.median(small) if len(small) else s0
+    return pse, len(effects) / 3.
+
+
+def factorial_effects(binaries, fitness, names=None, confidence=0.95, max_order=None, floor=FITNESS_FLOOR):
+    """
+    Estimates every main and interaction effect on log10(fitness)
+    :param binaries: binary test directory of each run. Replicates repeat a binary
+    :param fitness: fitness of each run
+    :param names: name of each factor, i.e. ['pop', 'stack', 'dif', 'cross', 'mut']
+    :param confidence: confidence level of the intervals
+    :param max_order: highest interaction order estimated, None for all
+    :param floor: smallest fitness, keeps exact models finite on the log scale
+    :return: list of dicts with term, order, effect (change of log10 fitness from the low to the high level),
+             se, low, high, significant and aliases, ranked by the size of the effect.
+             Terms that are not estimable from the runs are left out, see estimable_terms
+    """
+    factors = factor_matrix(binaries)
+    names = names or ['x' + str(i + 1) for i in range(factors.shape[1])]
+    terms = effect_terms(factors.shape[1], max_order)
+    labels = ['*'.join(names[i] for i in term) for term in terms]
+    X = model_matrix(factors, terms)
+    y = np.log10(np.maximum(np.asarray(fitness, dtype=float), floor))
+
+    kept, aliased = estimable_terms(X)
+    # alias matrix: an estimated coefficient is its term plus these multiples of the terms left out
+    aliases = np.linalg.lstsq(X[:, kept], X[:, aliased], rcond=None)[0] if aliased else np.zeros([len(kept), 0])
+    aliasLabels = [labels[column - 1] for column in aliased]
+    if aliased:
+        print('{0} of the {1} effect terms are not estimable from {2} runs and are aliased with the ranked '
+              'terms'.format(len(aliased), len(labels), len(y)))
+        intercept = alias_text(aliases[0], aliasLabels)
+        if intercept:
+            print('    the mean is aliased with ' + intercept)
+    X = X[:, kept]
+    terms = [(labels[column - 1], len(terms[column - 1])) for column in kept[1:]]
+
+    coefficients, residuals, rank, _ = np.linalg.lstsq(X, y, rcond=None)
+    effects = 2 * coefficients[1:]  # a coefficient is half the change from -1 to +1
+    dof = len(y) - rank
+    if dof > 0:  # replicates, use the residual error
+        sigma2 = np.sum((y - X @ coefficients) ** 2) / dof
+        se = 2 * np.sqrt(sigma2 * np.diag(np.linalg.pinv(X.T @ X))[1:])
+    else:
+        pse, dof = lenth_pse(effects)
+        se = np.full(len(effects), pse)
+    half = t_quantile(0.5 + confidence / 2, dof) * se
+
+    rows = [{'term': term, 'order': order, 'effect': float(effect), 'se': float(s), 'low': float(effect - h),
+             'high': float(effect + h), 'significant': bool(abs(effect) > h),
+             'aliases': alias_text(alias, aliasLabels)}
+            for (term, order), effect, s, h, alias in zip(terms, effects, se, half, aliases[1:])]
+    return sorted(rows, key=lambda row: -abs(row['effect']))
+
+
+def write_effects(csvPath, effects):
+    """
+    Writes ranked effects to a csv
+    :param csvPath: file path of the csv, replaced if it exists
+    :param effects: list of dicts created by factorial_effects
+    """
+    with open(csvPath, 'w', newline='') as csvfile:
+        fieldNames = ['term', 'order', 'effect', 'se', 'low', 'high', 'significant', 'aliases']
+        w = csv.DictWriter(csvfile, dialect='excel', fieldnames=fieldNames)
+        w.writeheader()
+        w.writerows(effects)
+
+
+def main():
+    """ Prints the ranked effects of a study in a results store """
+    dbPath, study = sys.argv[1:3]
+    with ResultsStore(dbPath, study) as store:
+        rows = store.select('binary, fitness', 'fitness IS NOT NULL')
+    binaries, fitness = zip(*rows)
+    for row in factorial_effects(binaries, fitness, sys.argv[3:] or None):
+        print('{term:>24} {effect:+9.3f} [{low:+9.3f}, {high:+9.3f}] {0:1} {aliases}'.format(
+            '*' if row['significant'] else '', **row))
+
+
+if __name__ == "__main__":
+    main()
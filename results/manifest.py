@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Manifest of the trials an incremental result collection has already processed.
+
+Every entry records the checkpoint a trial was collected from (path, size, mtime), the hash of
+the csv row it produced and the row itself. A trial whose newest checkpoint still matches its
+entry is skipped, and its row is reused when the csv is rewritten.
+"""
+
+import hashlib
+import json
+import os
+
+from trial_summary import pickle_signature
+
+MANIFEST_NAME = "manifest.json"
+
+
+def output_hash(row):
+    """
+    :param row: csv row of a trial
+    :return: sha256 of the row
+    """
+    return hashlib.sha256(json.dumps(row, sort_keys=True).encode()).hexdigest()
+
+
+def pickle_entry(beamBendingPkl, row):
+    """
+    Creates the manifest entry of a processed trial
+    :param beamBendingPkl: path to the beam_bending_#####.pkl the trial was collected from
+    :param row: csv row of the trial
+    :return: dict with the pickle path, size and mtime, the output hash and the row
+    """
+    entry = {'pkl': os.path.abspath(beamBendingPkl)}
+    entry.update(pickle_signature(beamBendingPkl))
+    entry['output_hash'] = output_hash(row)
+    entry['row'] = row
+    return entry
+
+
+def is_current(entry, beamBendingPkl):
+    """
+    :param entry: manifest entry of a trial, or None
+    :param beamBendingPkl: path to the newest beam_bending_#####.pkl of the trial, or None
+    :return: True if the trial was processed from exactly this checkpoint
+    """
+    if entry is None or beamBendingPkl is None:
+        return False
+    if entry['pkl'] != os.path.abspath(beamBendingPkl):
+        return False  # a newer checkpoint was written
+    signature = pickle_signature(beamBendingPkl)
+    return entry['size'] == signature['size'] and entry['mtime'] == signature['mtime']
+
+
+class Manifest:
+    """ Manifest file of a test directory, keyed on trial labels such as '10101_1' """
+
+    def __init__(self, manifestPath):
+        """
+        :param manifestPath: file path of the manifest. A missing file starts an empty manifest
+        """
+        self.manifestPath = manifestPath
+        try:
+            with open(manifestPath) as manifestFile:
+                self.entries = json.load(manifestFile)
+        except FileNotFoundError:
+            self.entries = {}
+
+    def get(self, label):
+        """ :return: entry of a trial, or None if it was never processed """
+        return self.entries.get(label)
+
+    def update(self, label, entry):
+        """
+        :param label: trial label
+        :param entry: new entry of the trial, None removes the trial (i.e. its checkpoint is gone)
+        """
+        if entry is None:
+            self.entries.pop(label, None)
+        else:
+            self.entries[label] = entry
+
+    def save(self):
+        """ Writes the manifest under a temporary name first, so an interrupted run never leaves half a file """
+        tmp = self.manifestPath + '.tmp'
+        with open(tmp, 'w') as manifestFile:
+            json.dump(self.entries, manifestFile, indent=1, sort_keys=True)
+        os.replace(tmp, self.manifestPath)
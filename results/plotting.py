@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Plots of the best individual of each trial against the analytic solution.
+
+Opening a new pyplot figure for every trial is the slowest part of plotting, so one figure and
+its lines are kept per process and only the model line is updated between trials. Figures are
+created without pyplot, which keeps the plotters independent of each other in parallel workers.
+"""
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from evaluation import get_context
+from trial_summary import summary_curve
+
+L = 10.
+
+
+def draw_axes(ax, k, L=L):
+    """
+    Draws the analytic solution, the training data and an empty model line
+    :param ax: matplotlib axes
+    :param k: load constant of the beam bending problem
+    :param L: length of the beam
+    :return: line of the best GPSR model
+    """
+    context = get_context(k, L)
+    ax.plot(context.x, context.analytic, 'r-', label='Analytical Solution')
+    ax.plot(context.x_training, context.y_training, 'gx', label='Training Data Points')
+    model_line, = ax.plot(context.x, np.zeros_like(context.x), 'b-', label='Best GPSR Model')
+    ax.set_xlabel('x')
+    ax.set_ylabel('displacement')
+    return model_line
+
+
+def set_model(ax, model_line, summary):
+    """
+    Shows the best individual of a trial on the model line and rescales the axes
+    :param summary: trial summary, or None to hide the model line
+    """
+    if summary is None:
+        model_line.set_visible(False)
+    else:
+        x, y = summary_curve(summary)
+        model_line.set_data(x.ravel(), y.ravel())
+        model_line.set_visible(True)
+    ax.relim(visible_only=True)
+    ax.autoscale_view()
+
+
+class BestIndividualPlotter:
+    """
+    Keeps one figure with the analytic solution and training data drawn once.
+    Every plot only replaces the data of the model line and saves the figure.
+    """
+
+    def __init__(self, k, L=L):
+        """
+        :param k: load constant of the beam bending problem
+        :param L: length of the beam
+        """
+        self.figure = Figure()
+        FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot()
+        self.model_line = draw_axes(self.ax, k, L)
+        self.ax.legend()
+
+    def plot(self, summary, dst):
+        """
+        Saves the plot of one trial
+        :param summary: trial summary (see trial_summary.py)
+        :param dst: file path of the .png
+        """
+        set_model(self.ax, self.model_line, summary)
+        self.figure.savefig(dst)
+
+
+_plotters = {}
+
+
+def get_plotter(k, L=L):
+    """ :return: the BestIndividualPlotter of this process for the given problem """
+    if (k, L) not in _plotters:
+        _plotters[(k, L)] = BestIndividualPlotter(k, L)
+    return _plotters[(k, L)]
+
+
+def plot_best_individual(summary, dst, k, L=L):
+    """
+    Saves the plot of a trial's best individual straight to its destination
+    :param summary: trial summary (see trial_summary.py)
+    :param dst: file path of the .png
+    :param k: load constant of the beam bending problem
+    :param L: length of the beam
+    """
+    get_plotter(k, L).plot(summary, dst)
+
+
+def plot_montage(summaries, labels, dst, k, L=L, columns=5):
+    """
+    Saves the plots of several trials, i.e. all trials of a binary, as one grid
+    :param summaries: trial summaries, None for trials without a .pkl file
+    :param labels: title of each plot
+    :param dst: file path of the .png
+    :param k: load constant of the beam bending problem
+    :param L: length of the beam
+    :param columns: plots per row
+    """
+    columns = min(columns, len(summaries))
+    rows = -(-len(summaries) // columns)
+    figure = Figure(figsize=(4 * columns, 3 * rows))
+    FigureCanvasAgg(figure)
+    axes = figure.subplots(rows, columns, squeeze=False).ravel()
+    for ax, summary, label in zip(axes, summaries, labels):
+        set_model(ax, draw_axes(ax, k, L), summary)
+        ax.set_title(label if summary is not None else label + ' (missing)')
+    for ax in axes[len(summaries):]:
+        ax.set_visible(False)
+    axes[0].legend()
+    figure.tight_layout()
+    figure.savefig(dst)
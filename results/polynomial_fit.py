@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Numeric recovery of the polynomial coefficients of a BINGO model.
+
+The beam bending models are polynomials in x, so instead of simplifying their expression symbolically
+the model is evaluated on a few Chebyshev points and a Vandermonde least squares system is solved
+with NumPy. A small residual does not prove the model is a polynomial: every smooth function on [0, L],
+i.e. x/(x + 1000) or sin(0.05 x), is fit within the tolerance by a low degree. The fit is only used for
+models that are polynomials by their structure (bingo_parser.is_polynomial), symbolic simplification
+handles the others.
+"""
+
+import numpy as np
+
+# interval the models are fitted on
+L = 10.
+MAX_DEGREE = 8
+N_SAMPLES = 2 * MAX_DEGREE + 1  # overdetermined for every degree
+RESIDUAL_TOLERANCE = 1e-9
+
+
+def sample_points(a=0., b=L, n=N_SAMPLES):
+    """
+    Chebyshev points on [a, b]. They keep the Vandermonde system well conditioned
+    :param a: start of the interval
+    :param b: end of the interval
+    :param n: number of points
+    :return: 1-D array of increasing points
+    """
+    k = np.arange(n)
+    t = -np.cos((2 * k + 1) * np.pi / (2 * n))
+    return (a + b) / 2 + (b - a) / 2 * t
+
+
+class PolynomialFit:
+    """
+    Least squares polynomial fit of sampled model values.
+    The lowest degree whose relative residual is below the tolerance is used. If no degree up to
+    max_degree fits, 'is_polynomial' is False. A fit does not show that the model is a polynomial,
+    only that it is close to one on the sample points.
+    """
+
+    def __init__(self, x, y, max_degree=MAX_DEGREE, tolerance=RESIDUAL_TOLERANCE, rounding_num=None):
+        """
+        :param x: sample points
+        :param y: model evaluated on the sample points
+        :param max_degree: highest degree tried
+        :param tolerance: largest relative residual accepted as an exact fit
+        :param rounding_num: number of decimals the coefficients are rounded to in 'result'. None skips rounding
+        """
+        self.x = np.ravel(np.asarray(x, dtype=float))
+        self.y = np.ravel(np.asarray(y, dtype=float))
+        self.max_degree = max_degree
+        self.tolerance = tolerance
+        self.rm = rounding_num
+        self.strategy = 'polyfit'
+        self.coefficients = None  # ascending powers of x
+        self.degree = None
+        self.residual = np.inf
+        self.is_polynomial = False
+        self.result = None
+        self.run_fit()
+
+    def run_fit(self):
+        """ Fits increasing degrees until the residual is below the tolerance """
+        if not np.all(np.isfinite(self.y)):
+            return  # nan or inf is never a polynomial
+        scale = max(np.max(np.abs(self.y)), np.finfo(float).tiny)
+        for degree in range(min(self.max_degree, len(self.x) - 2) + 1):
+            series = np.polynomial.Polynomial.fit(self.x, self.y, degree)
+            residual = np.max(np.abs(series(self.x) - self.y)) / scale
+            if residual <= self.tolerance:
+                self.degree = degree
+                self.residual = residual
+                self.coefficients = self.drop_negligible(series.convert().coef, scale)
+                self.is_polynomial = True
+                self.result = self.as_string()
+                return
+            self.residual = min(self.residual, residual)
+
+    def drop_negligible(self, coefficients, scale):
+        """
+        Zeroes coefficients whose contribution over the sampled interval is below the tolerance.
+        These are round off left by the fit, i.e. the x**2 term of a model without one.
+        """
+        reach = np.max(np.abs(self.x)) ** np.arange(len(coefficients))
+        coefficients = np.array(coefficients)
+        coefficients[np.abs(coefficients) * reach <= self.tolerance * scale] = 0.
+        return coefficients
+
+    def as_string(self, variable='X_0'):
+        """
+        Writes the fitted polynomial with the highest power first, in the format sympy prints polynomials
+        :param variable: name of the variable
+        :return: polynomial as a String
+        """
+        terms = []
+        for power in range(len(self.coefficients) - 1, -1, -1):
+            c = float(self.coefficients[power])
+            if self.rm is not None:
+                c = round(c, self.rm)
+            if c == 0.:
+                continue
+            if power == 0:
+                term = repr(abs(c))
+            elif power == 1:
+                term = "{0}*{1}".format(repr(abs(c)), variable)
+            else:
+                term = "{0}*{1}**{2}".format(repr(abs(c)), variable, power)
+            if not terms:
+                terms.append(term if c > 0 else "-" + term)
+            else:
+                terms.append(("+ " if c > 0 else "- ") + term)
+        if not terms:
+            return "0"
+        return " ".join(terms)
+
+
+def fit_individual(best_ind, rounding_num=None):
+    """
+    Fits a BINGO individual by evaluating it on the sample points. Only exact for individuals that are
+    polynomials by their structure, see bingo_parser.is_polynomial
+    :param best_ind: individual with evaluate_equation_at
+    :param rounding_num: number of decimals the coefficients are rounded to
+    :return: PolynomialFit of the individual
+    """
+    x = sample_points()
+    y = best_ind.evaluate_equation_at(x.reshape([-1, 1]))
+    return PolynomialFit(x, y, rounding_num=rounding_num)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite store of the collected results of every study.
+
+Rows are buffered and written in batches inside one transaction, instead of reopening a csv for
+every trial. Each trial is keyed on (study, t, binary, trial), so collecting a trial again replaces
+its row. The csv files the results scripts used to append to are exported from the store on demand.
+
+Export a study from the command line:
+    python results_store.py results.sqlite tuning_params Fitness_Data.csv
+"""
+
+import csv
+import sqlite3
+import sys
+
+import numpy as np
+
+COLUMNS = ('study', 't', 'binary', 'trial', 'fitness', 'complexity', 'generations', 'expression')
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    study TEXT NOT NULL,
+    t TEXT NOT NULL DEFAULT '',
+    binary TEXT NOT NULL DEFAULT '',
+    trial INTEGER NOT NULL DEFAULT 0,
+    fitness REAL,
+    complexity INTEGER,
+    generations INTEGER,
+    expression TEXT,
+    PRIMARY KEY (study, t, binary, trial)
+)
+"""
+# numpy dtype of load(). Missing complexities and generations are -1
+DTYPE = np.dtype([('study', object), ('t', object), ('binary', object), ('trial', np.int64), ('fitness', np.float64),
+                  ('complexity', np.int64), ('generations', np.int64), ('expression', object)])
+BATCH_SIZE = 1000
+
+
+class ResultsStore:
+    """
+    Results of one study in a SQLite file. Use as a context manager, so the last batch is written on exit.
+    """
+
+    def __init__(self, dbPath, study, batch_size=BATCH_SIZE):
+        """
+        :param dbPath: file path of the SQLite file, created if missing
+        :param study: name of the study, i.e. the test directory
+        :param batch_size: number of buffered rows written at once
+        """
+        self.dbPath = dbPath
+        self.study = study
+        self.batch_size = batch_size
+        self.buffer = []
+        self.connection = sqlite3.connect(dbPath)
+        self.connection.execute(SCHEMA)
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, binary='', trial=0, fitness=None, generations=None, expression=None, t='', complexity=None):
+        """
+        Buffers the result of one trial
+        :param binary: binary test directory, '' for studies without binaries
+        :param trial: trial index
+        :param fitness: fitness of the best individual
+        :param generations: generations of the run
+        :param expression: simplified best individual
+        :param t: training data directory, i.e. 't4', '' for studies without one
+        :param complexity: complexity of the best individual
+        """
+        self.buffer.append((self.study, t, binary, int(trial), fitness, complexity, generations, expression))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """ Writes the buffered rows in one transaction """
+        if not self.buffer:
+            return
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self.buffer)
+        self.buffer = []
+
+    def clear(self):
+        """ Removes every row of the study, i.e. before collecting it from scratch """
+        self.buffer = []
+        with self.connection:
+            self.connection.execute("DELETE FROM results WHERE study = ?", (self.study,))
+
+    def close(self):
+        """ Writes the remaining rows and closes the file """
+        self.flush()
+        self.connection.close()
+
+    def select(self, columns='*', where=None, params=(), order='rowid'):
+        """
+        Queries the rows of the study
+        :param columns: SQL column list or expressions
+        :param where: optional SQL condition, i.e. 'fitness <= ?'
+        :param params: parameters of the condition
+        :param order: SQL order. rowid is the order the rows were written in
+        :return: list of tuples
+        """
+        self.flush()
+        sql = "SELECT {0} FROM results WHERE study = ?".format(columns)
+        if where:
+            sql += " AND (" + where + ")"
+        sql += " ORDER BY " + order
+        return self.connection.execute(sql, (self.study,) + tuple(params)).fetchall()
+
+    def load(self, where=None, params=()):
+        """
+        :param where: optional SQL condition, i.e. "t = 't4'"
+        :param params: parameters of the condition
+        :return: numpy structured array of the rows with dtype DTYPE
+        """
+        columns = "study, t, binary, trial, fitness, IFNULL(complexity, -1), IFNULL(generations, -1), expression"
+        rows = self.select(columns, where, params)
+        return np.array(rows, dtype=DTYPE) if rows else np.empty(0, dtype=DTYPE)
+
+    def export_csv(self, csvPath, fields, where=None, params=()):
+        """
+        Writes the rows of the study to a csv
+        :param csvPath: file path of the csv, replaced if it exists
+        :param fields: list of (header, SQL column or expression), i.e. [('f(X_0)', 'expression')]
+        :param where: optional SQL condition
+        :param params: parameters of the condition
+        """
+        rows = self.select(", ".join(sql for header, sql in fields), where, params)
+        with open(csvPath, 'w', newline='') as csvfile:
+            w = csv.writer(csvfile, dialect='excel')
+            w.writerow([header for header, sql in fields])
+            w.writerows(rows)
+
+
+def main():
+    """ Exports every column of a study: results_store.py <dbPath> <study> <csvPath> """
+    dbPath, study, csvPath = sys.argv[1:4]
+    with ResultsStore(dbPath, study) as store:
+        store.export_csv(csvPath, [(column, column) for column in COLUMNS])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+""" @author: Sam Parry, Erick Solum """
+
+import multiprocessing
+import numpy as np
+from sympy import simplify, expand, cancel, Poly, Pow, Add, Symbol, I, sympify, srepr
+from sympy import preorder_traversal, Float
+from simplify_cache import cached_simplify
+from polynomial_fit import PolynomialFit, sample_points
+from bingo_parser import Node, NotPolynomialError, is_polynomial, parse_bingo
+
+# seconds a full sympy simplify may run on one expression before the raw expression is returned
+DEFAULT_TIME_BUDGET = 60.
+
+
+class SimplificationTimeout(Exception):
+    """ Raised when sympy simplify does not finish within its time budget """
+
+
+class Simplification:
+    """
+    Converts an polynomial expression into a simplified and expanded polynomial form.
+    Intented for use accepting equations from BINGO
+    Results are memoized on disk (see simplify_cache.py), so each expression is only simplified once.
+
+    Cheap strategies are tried first (multiplying out the parse tree, expand, cancel, polynomial conversion).
+    Full sympy simplify only runs
+    when none of them produces a polynomial, and it runs in a worker process that is killed once
+    time_budget runs out. The strategy that produced the result is stored in the attribute 'strategy'.
+    A negative constant to a fractional power makes the model complex on the reals. Such a model is not
+    simplified, 'result' holds the raw expression and the strategy is 'complex'.
+    On a timeout 'result' holds the raw expression and 'timed_out' is set.
+    """
+
+    def __init__(self, simplification_input, rounding_num=None, zero_threshold=None,
+                 time_budget=DEFAULT_TIME_BUDGET):
+        """
+        Accepts the string representation of a polynomial expression from BINGO.
+        Converts the polynomial into an expanded form stored as the attribute 'result'
+        :param simplification_input: String polynomial expression
+        :param rounding_num: number of decimals the floats of the result are rounded to. None skips rounding
+        :param zero_threshold: floats smaller than this are replaced by 0 before simplifying. None skips the check
+        :param time_budget: seconds full simplification may take. None runs it in process without a limit
+        """
+        self.rm = rounding_num
+        self.zero_threshold = zero_threshold
+        self.time_budget = time_budget
+        self.strategy = 'cached'
+        self.timed_out = False
+        if isinstance(simplification_input, str):
+            self.input_string = simplification_input
+        else:
+            try:
+                self.input_string = str(simplification_input)
+            except:
+                raise ValueError("Input must be a String representation of a polynomial")
+        try:
+            self.result = cached_simplify(self.input_string, self.run_simplify, 'Simplification',
+                                          self.rm, self.zero_threshold)
+        except SimplificationTimeout:
+            # timeouts are not cached, so a later run with a larger budget tries again
+            self.strategy = 'timeout'
+            self.timed_out = True
+            self.result = self.input_string
+
+    def invalid_check(self, tree):
+        """ Replaces the constants of the parse tree whose magnitude is below the zero threshold by 0 """
+        if tree.op == 'number':
+            if abs(float(tree.value)) <= self.zero_threshold:
+                return Node('number', value='0')
+            return tree
+        return Node(tree.op, [self.invalid_check(arg) for arg in tree.args], tree.value)
+
+    def run_simplify(self):
+        """
+        Performs symbolic simplification on the polynomial.
+        :return: expanded polynomial as a String
+        """
+        tree = parse_bingo(self.input_string)
+        if self.zero_threshold is not None:
+            tree = self.invalid_check(tree)
+        expr_v4 = self.tiered_simplify(tree)
+        if expr_v4 is None:
+            return self.input_string
+        expr_v5 = expr_v4
+        if self.rm is not None:
+            for a in preorder_traversal(expr_v4):
+                if isinstance(a, Float):
+                    expr_v5 = expr_v5.subs(a, round(a, self.rm))
+        return str(expr_v5)
+
+    def tiered_simplify(self, tree):
+        """
+        Tries the cheap strategies in order of cost and falls back to full simplification.
+        :param tree: parse tree of the expression (see bingo_parser.py)
+        :return: expanded sympy expression, None if the expression is complex on the reals
+        """
+        polynomial = self.polynomial_tier(tree)
+        if polynomial is not None:
+            return polynomial
+
+        expr = tree.to_sympy()
+        variables = sorted(expr.free_symbols, key=str)
+
+        # sympy leaves powers of negative floats unevaluated, i.e. (-1480.7)^(-2.07)
+        expr = expr.replace(lambda e: e.is_Pow and e.is_number, lambda e: e.evalf())
+        if expr.has(I):
+            self.strategy = 'complex'  # nan on the reals, simplifying would only hide the imaginary part
+            return None
+
+        self.strategy = 'expand'
+        expanded = expand(expr, complex=False)
+        if expanded.is_polynomial(*variables):
+            return expanded
+
+        self.strategy = 'cancel'
+        cancelled = cancel(expr)
+        if cancelled.is_polynomial(*variables):
+            return expand(cancelled, complex=False)
+
+        # BINGO writes integer powers with float exponents, i.e. (X_0)^(2.0)
+        self.strategy = 'poly'
+        integer_powers = expanded.replace(lambda e: e.is_Pow and e.exp.is_Float and e.exp.is_finite and e.exp == int(e.exp),
+                                          lambda e: Pow(e.base, int(e.exp)))
+        if variables and integer_powers.is_polynomial(*variables):
+            return Poly(integer_powers, *variables).as_expr()
+
+        self.strategy = 'simplify'
+        return expand(simplify_with_budget(expr, self.time_budget), complex=False)
+
+    def polynomial_tier(self, tree):
+        """
+        Multiplies the parse tree out numerically when it is a polynomial of at most one variable
+        :param tree: parse tree of the expression
+        :return: sympy polynomial, or None if the tree is not a polynomial
+        """
+        variables = tree.variables()
+        if len(variables) > 1:
+            return None
+        variable = variables.pop() if variables else 'X_0'
+        try:
+            polynomial = tree.to_polynomial(variable)
+        except NotPolynomialError:
+            return None
+        if not np.all(np.isfinite(polynomial.coef)):
+            return None  # i.e. a negative constant to a fractional power, left to sympy
+
+        self.strategy = 'polynomial'
+        x = Symbol(variable)
+        return Add(*[Float(repr(float(c))) * x ** k for k, c in enumerate(polynomial.coef) if c != 0])
+
+
+def simplify_trial(summary, rounding_num=None, zero_threshold=None, time_budget=DEFAULT_TIME_BUDGET):
+    """
+    Recovers the polynomial of a trial's best individual numerically from the values sampled into its
+    summary, if the model is a polynomial by its structure. Symbolic simplification runs for every other
+    model: a smooth function fits a polynomial on the samples as well, the fit would be a truncated series.
+    :param summary: trial summary (see trial_summary.py)
+    :param rounding_num: number of decimals the floats of the result are rounded to. None skips rounding
+    :param zero_threshold: passed on to Simplification
+    :param time_budget: passed on to Simplification
+    :return: PolynomialFit if the model is a polynomial, otherwise Simplification.
+             Either one stores the expression in 'result' and the method used in 'strategy'
+    """
+    if is_polynomial(summary['best_individual']):
+        fit = PolynomialFit(sample_points(), summary['samples'], rounding_num=rounding_num)
+        if fit.is_polynomial:
+            return fit
+    return Simplification(summary['best_individual'], rounding_num, zero_threshold, time_budget)
+
+
+def _simplify_worker(expr_srepr, connection):
+    """ Runs sympy simplify in a separate process and sends back the result or the exception it raised """
+    try:
+        result = simplify(sympify(expr_srepr), evaluate=False, symbolic=True)
+        connection.send((True, srepr(result)))
+    except Exception as e:
+        connection.send((False, e))
+
+
+def simplify_with_budget(expr, time_budget):
+    """
+    Runs sympy simplify with a hard time limit. The work happens in a worker process which is terminated
+    when the budget runs out, because simplify cannot be interrupted from within the same process.
+    :param expr: sympy expression
+    :param time_budget: seconds simplify may take. None runs simplify in this process without a limit
+    :return: simplified expression
+    """
+    if time_budget is None:
+        return simplify(expr, evaluate=False, symbolic=True)
+
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    worker = multiprocessing.Process(target=_simplify_worker, args=(srepr(expr), sender))
+    worker.start()
+    sender.close()
+    try:
+        if not receiver.poll(time_budget):
+            raise SimplificationTimeout("simplify exceeded {0} s on {1}".format(time_budget, expr))
+        success, result = receiver.recv()
+    except EOFError:
+        raise RuntimeError("simplify worker exited without a result")
+    finally:
+        if worker.is_alive():
+            worker.terminate()
+        worker.join()
+        receiver.close()
+    if not success:
+        raise result
+    return sympify(result)
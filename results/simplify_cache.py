@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent memoization of simplified BINGO expressions.
+
+Simplified expressions are kept in a small SQLite database so that rerunning any of the results
+scripts, or beam_eq_simp.simplify_beam_eq, on expressions it has seen before costs a lookup instead
+of a sympy simplification. The database is bounded in size and evicts the least recently used entries.
+SQLite handles the locking, so the cache can be shared by parallel collection workers. SQLite locking
+is not reliable on NFS, so the default database is on the node local temporary directory rather than
+in the home directory. If the database can not be used, i.e. it is locked, the cache is switched off
+for the rest of the run and expressions are simplified without it.
+
+Keys include CACHE_VERSION. Bump it whenever a change to a simplification routine changes its output,
+so results cached by the old code are not served.
+"""
+
+import getpass
+import hashlib
+import os
+import sqlite3
+import tempfile
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(tempfile.gettempdir(), "python_chpc_" + getpass.getuser(), "simplify_cache.sqlite")
+DEFAULT_MAX_ENTRIES = 100000
+CACHE_VERSION = 2  # 2: complex models are kept as they are instead of losing their '*I'
+
+
+def cache_key(expression, method, rounding_num=None, zero_threshold=None):
+    """
+    Hash of everything that decides the result of a simplification
+    :param expression: String expression from BINGO
+    :param method: name of the simplification routine, so that different routines never share results
+    :param rounding_num: number of decimals floats are rounded to, None if not rounded
+    :param zero_threshold: magnitude below which floats are replaced by 0, None if not replaced
+    :return: hex digest used as the cache key
+    """
+    settings = "{0}|{1}|{2}|{3}|".format(CACHE_VERSION, method, rounding_num, zero_threshold)
+    return hashlib.sha256((settings + expression).encode()).hexdigest()
+
+
+class SimplifyCache:
+    """
+    Size bounded LRU cache of simplified expressions stored on disk.
+    The location can be changed with the SIMPLIFY_CACHE environment variable, keep it off NFS. Setting it
+    to an empty string disables the cache.
+    """
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        :param path: file path of the SQLite database
+        :param max_entries: number of entries kept before the least recently used are evicted
+        """
+        if path is None:
+            path = os.environ.get("SIMPLIFY_CACHE", DEFAULT_CACHE_PATH)
+        self.path = path
+        self.max_entries = max_entries
+        self.connection = None
+
+    def connect(self):
+        """ Opens the database on first use and creates the table if it does not exist """
+        if self.connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(self.path, timeout=60)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS simplified "
+                                    "(key TEXT PRIMARY KEY, result TEXT NOT NULL, last_used REAL NOT NULL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS lru ON simplified (last_used)")
+            self.connection.commit()
+        return self.connection
+
+    def get(self, key):
+        """
+        :param key: key created by cache_key
+        :return: cached result, or None on a miss
+        """
+        connection = self.connect()
+        row = connection.execute("SELECT result FROM simplified WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        connection.execute("UPDATE simplified SET last_used = ? WHERE key = ?", (time.time(), key))
+        connection.commit()
+        return row[0]
+
+    def put(self, key, result):
+        """
+        Stores a result and evicts the least recently used entries past max_entries
+        :param key: key created by cache_key
+        :param result: simplified expression as a String
+        """
+        connection = self.connect()
+        connection.execute("INSERT OR REPLACE INTO simplified (key, result, last_used) VALUES (?, ?, ?)",
+                           (key, result, time.time()))
+        connection.execute("DELETE FROM simplified WHERE key IN (SELECT key FROM simplified "
+                           "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+        connection.commit()
+
+
+_shared_cache = None
+_cache_failed = False
+
+
+def get_cache():
+    """
+    :return: SimplifyCache shared by everything in this process, or None if the cache is disabled
+    """
+    global _shared_cache
+    if os.environ.get("SIMPLIFY_CACHE") == "" or _cache_failed:
+        return None
+    if _shared_cache is None:
+        _shared_cache = SimplifyCache()
+    return _shared_cache
+
+
+def cached_simplify(expression, simplify_func, method, rounding_num=None, zero_threshold=None):
+    """
+    Returns the cached simplification of an expression, running simplify_func only on a miss
+    :param expression: String expression from BINGO
+    :param simplify_func: callable returning the simplified expression
+    :param method: name of the simplification routine
+    :param rounding_num: rounding setting of the routine
+    :param zero_threshold: zero threshold setting of the routine
+    :return: simplified expression as a String
+    """
+    cache = get_cache()
+    if cache is None:
+        return str(simplify_func())
+
+    key = cache_key(expression, method, rounding_num, zero_threshold)
+    try:
+        result = cache.get(key)
+    except (sqlite3.Error, OSError) as e:
+        disable_cache(cache, e)
+        return str(simplify_func())
+    if result is None:
+        result = str(simplify_func())
+        try:
+            cache.put(key, result)
+        except (sqlite3.Error, OSError) as e:
+            disable_cache(cache, e)
+    return result
+
+
+def disable_cache(cache, error):
+    """ Switches the cache off for the rest of the process after the database failed """
+    global _cache_failed
+    _cache_failed = True
+    print("simplify cache {0} is not usable ({1}), simplifying without it".format(cache.path, error))
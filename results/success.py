@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Success rates of the trials of each training data size over a sweep of fitness thresholds.
+
+A trial is a success at a threshold if its fitness is at or below it. The rates of all thresholds
+are computed at once from one boolean [trials, thresholds] matrix, and their confidence intervals
+come from bootstrap resamples of the trials drawn as one index array. The expected number of runs
+until the first success, 1 / rate, and the runs needed for a 95 % chance of at least one success
+show how many trials a training data size is worth paying for.
+
+    python success.py <results.sqlite> <study> [threshold ...]
+"""
+
+import csv
+import sys
+
+import numpy as np
+from results_store import ResultsStore
+from checkpoint_index import t_order
+
+THRESHOLDS = (1e-5, 1e-6, 1e-7, 1e-8, 1e-9, 1e-10)
+N_BOOTSTRAP = 2000
+
+
+def success_matrix(fitness, thresholds):
+    """
+    :param fitness: fitness of each trial
+    :param thresholds: fitness thresholds
+    :return: boolean array of shape [trials, thresholds]
+    """
+    return np.asarray(fitness, dtype=float)[:, None] <= np.asarray(thresholds, dtype=float)[None, :]
+
+
+def bootstrap_rates(fitness, thresholds, n_bootstrap=N_BOOTSTRAP, confidence=0.95, seed=0):
+    """
+    Success rates with percentile bootstrap confidence intervals
+    :param fitness: fitness of each trial
+    :param thresholds: fitness thresholds
+    :param n_bootstrap: number of resamples
+    :param confidence: confidence level of the intervals
+    :param seed: seed of the resamples, so reruns give the same intervals
+    :return: rate, lower and upper bound, each an array over the thresholds
+    """
+    successes = success_matrix(fitness, thresholds)
+    if len(successes) == 0:
+        empty = np.full(len(thresholds), np.nan)
+        return empty, empty, empty
+    resamples = np.random.default_rng(seed).integers(0, len(successes), (n_bootstrap, len(successes)))
+    rates = successes[resamples].mean(axis=1)  # [n_bootstrap, thresholds]
+    tail = 50 * (1 - confidence)
+    low, high = np.percentile(rates, [tail, 100 - tail], axis=0)
+    return successes.mean(axis=0), low, high
+
+
+def expected_runs(rate):
+    """
+    :param rate: success rate of a single run
+    :return: expected number of runs until the first success, inf for a rate of 0
+    """
+    rate = np.asarray(rate, dtype=float)
+    with np.errstate(divide='ignore'):
+        return np.where(rate > 0, 1 / rate, np.inf)
+
+
+def runs_for_success(rate, probability=0.95):
+    """
+    :param rate: success rate of a single run
+    :param probability: chance of at least one success
+    :return: number of runs needed to reach the chance, inf for a rate of 0
+    """
+    rate = np.asarray(rate, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        runs = np.ceil(np.log(1 - probability) / np.log(1 - rate))
+    return np.where(rate >= 1, 1., np.where(rate > 0, runs, np.inf))
+
+
+def success_table(groups, fitness, thresholds=THRESHOLDS, **bootstrap):
+    """
+    Success rates of every group, i.e. training data size, and threshold
+    :param groups: group of each trial
+    :param fitness: fitness of each trial
+    :param thresholds: fitness thresholds
+    :param bootstrap: keyword arguments of bootstrap_rates
+    :return: list of dicts with group, threshold, trials, rate, low, high, expected_runs and runs_95
+    """
+    groups = np.asarray(groups)
+    fitness = np.asarray(fitness, dtype=float)
+    rows = []
+    for group in sorted(set(groups.tolist()), key=t_order):
+        trials = fitness[groups == group]
+        rate, low, high = bootstrap_rates(trials, thresholds, **bootstrap)
+        for i, threshold in enumerate(thresholds):
+            rows.append({'group': group, 'threshold': threshold, 'trials': len(trials),
+                         'rate': float(rate[i]), 'low': float(low[i]), 'high': float(high[i]),
+                         'expected_runs': float(expected_runs(rate[i])),
+                         'runs_95': float(runs_for_success(rate[i]))})
+    return rows
+
+
+def write_success(csvPath, rows):
+    """
+    Writes a success table to a csv
+    :param csvPath: file path of the csv, replaced if it exists
+    :param rows: list of dicts created by success_table
+    """
+    with open(csvPath, 'w', newline='') as csvfile:
+        fieldNames = ['group', 'threshold', 'trials', 'rate', 'low', 'high', 'expected_runs', 'runs_95']
+        w = csv.DictWriter(csvfile, dialect='excel', fieldnames=fieldNames)
+        w.writeheader()
+        w.writerows(rows)
+
+
+def main():
+    """ Prints the success rates of every t of a study in a results store """
+    dbPath, study = sys.argv[1:3]
+    thresholds = [float(threshold) for threshold in sys.argv[3:]] or THRESHOLDS
+    with ResultsStore(dbPath, study) as store:
+        groups, fitness = zip(*store.select('t, fitness', 'fitness IS NOT NULL'))
+    for row in success_table(groups, fitness, thresholds):
+        print('{group:>8} {threshold:8.1e} {rate:6.1%} [{low:6.1%}, {high:6.1%}] runs {expected_runs:6.1f} '
+              '95%: {runs_95:4.0f}'.format(**row))
+
+
+if __name__ == "__main__":
+    main()
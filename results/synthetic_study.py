@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic study trees, so result collection can be run and measured without the CHPC tree or bingo.
+
+build_study writes t#/binary/trial# directories, each with a beam_bending_#####.pkl holding a stand-in
+archipelago. The stand-in has everything trial_summary reads from a bingo archipelago:
+get_best_individual, generational_age, and a best individual with fitness, get_complexity, constants
+and evaluate_equation_at. Its models look like the ones BINGO prints for the beam bending problem,
+and part of them repeat, as they do in a real study. Most are polynomials, which the polynomial fit
+recovers; a fraction are not, so that the sympy tiers and the simplify cache are exercised as well.
+load_synthetic unpickles a stand-in without bingo.
+
+    python synthetic_study.py <root> <trials> [--population N] [--distinct FRACTION] [--nonpolynomial FRACTION]
+                              [--seed SEED]
+"""
+
+import argparse
+import itertools
+import os
+import pickle
+
+import numpy as np
+from bingo_parser import parse_bingo
+
+# models in the form BINGO prints them, filled in with random constants
+TEMPLATES = (
+    '(X_0)(X_0)({a})',
+    '(X_0)(X_0 - {b})((X_0)/({a}) )',
+    '(X_0)(X_0)(X_0 + {b})(X_0 - {c})/({a})',
+    '((X_0)^(2))((X_0)^(2) + ({b})(X_0) + {c})/({a})',
+    '(X_0 + -{b})((X_0)/({a}) ) + ({c})(X_0)',
+)
+# models the polynomial fit rejects, simplified by sympy or, for the complex one, kept as they are
+NONPOLYNOMIAL_TEMPLATES = (
+    '(X_0)(X_0)/(X_0 + {b})',
+    '((X_0)^(0.5))(X_0 - {b})/({a})',
+    '(X_0)(X_0 - {b})/((X_0)(X_0) + {c})',
+    '(X_0)(X_0 - {b})((X_0 + {c})^(1.5))/({a})',
+    '(X_0)((-{b})^(0.5))/({a})',
+)
+NONPOLYNOMIAL = 0.2  # fraction of the best individuals that are not polynomials
+BINARY_DIGITS = 5
+TRIALS_PER_BINARY = 10
+
+
+class SyntheticIndividual:
+    """ Stand-in for a bingo AGraph individual """
+
+    def __init__(self, expression, fitness, complexity, constants):
+        self.expression = expression
+        self.fitness = fitness
+        self.complexity = complexity
+        self.constants = constants
+
+    def __str__(self):
+        return self.expression
+
+    def get_complexity(self):
+        return self.complexity
+
+    def evaluate_equation_at(self, x):
+        """
+        :param x: array of shape [n, 1]
+        :return: the model evaluated at x, shape [n, 1]
+        """
+        return parse_bingo(self.expression).evaluate(x).reshape([-1, 1])
+
+
+class SyntheticArchipelago:
+    """ Stand-in for a bingo parallel archipelago checkpoint """
+
+    def __init__(self, population, generational_age):
+        """
+        :param population: list of SyntheticIndividual, the first one is the best
+        :param generational_age: number of generations
+        """
+        self.population = population
+        self.generational_age = generational_age
+
+    def get_best_individual(self):
+        return self.population[0]
+
+
+def random_model(rng, nonpolynomial=0.):
+    """
+    :param rng: numpy random generator
+    :param nonpolynomial: probability of a model that is not a polynomial
+    :return: a model string and its constants
+    """
+    constants = {'a': rng.uniform(1e3, 1e4), 'b': rng.uniform(5., 15.), 'c': rng.uniform(50., 150.)}
+    templates = NONPOLYNOMIAL_TEMPLATES if rng.random() < nonpolynomial else TEMPLATES
+    return rng.choice(templates).format(**constants), list(constants.values())
+
+
+def trial_dirs(n_trials):
+    """
+    :param n_trials: number of trials
+    :return: relative t#/binary/trial# directories of the first n_trials trials, t2, t4, ... first
+    """
+    binaries = [''.join(digits) for digits in itertools.product('01', repeat=BINARY_DIGITS)]
+    per_t = len(binaries) * TRIALS_PER_BINARY
+    dirs = []
+    for i in range(n_trials):
+        t, rest = divmod(i, per_t)
+        binary, trial = divmod(rest, TRIALS_PER_BINARY)
+        dirs.append(os.path.join('t' + str(2 * (t + 1)), binaries[binary], 'trial' + str(trial)))
+    return dirs
+
+
+def build_study(root, n_trials, population=100, distinct=0.5, seed=0, nonpolynomial=NONPOLYNOMIAL):
+    """
+    Writes a synthetic study tree. Existing trials are overwritten.
+    :param root: study root directory
+    :param n_trials: number of trials
+    :param population: number of individuals in each archipelago, sets the size of the pickles
+    :param distinct: fraction of the best individuals that are distinct models, the rest repeat one of them
+    :param seed: seed of the models and fitness values
+    :param nonpolynomial: fraction of the distinct best individuals that are not polynomials
+    :return: relative directories of the trials
+    """
+    rng = np.random.default_rng(seed)
+    models = [random_model(rng, nonpolynomial) for _ in range(max(1, int(round(distinct * n_trials))))]
+    dirs = trial_dirs(n_trials)
+    for i, trialDir in enumerate(dirs):
+        expression, constants = models[i] if i < len(models) else models[rng.integers(len(models))]
+        individuals = [SyntheticIndividual(expression, 10 ** rng.uniform(-12, -4), int(rng.integers(5, 40)),
+                                           constants)]
+        individuals += [SyntheticIndividual(random_model(rng)[0], 1., 20, []) for _ in range(population - 1)]
+        generations = int(rng.integers(1, 100)) * 1000
+        os.makedirs(os.path.join(root, trialDir), exist_ok=True)
+        pklPath = os.path.join(root, trialDir, 'beam_bending_{0}.pkl'.format(generations))
+        with open(pklPath, 'wb') as pklFile:
+            pickle.dump(SyntheticArchipelago(individuals, generations), pklFile, protocol=pickle.HIGHEST_PROTOCOL)
+    return dirs
+
+
+def load_synthetic(beamBendingPkl):
+    """
+    Unpickles a stand-in archipelago without bingo, replaces trial_summary.load_archipelago
+    :param beamBendingPkl: path to a beam_bending_#####.pkl written by build_study
+    :return: SyntheticArchipelago
+    """
+    with open(beamBendingPkl, 'rb') as pklFile:
+        return pickle.load(pklFile)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic t/binary/trial study tree")
+    parser.add_argument("root", help="study root directory")
+    parser.add_argument("trials", type=int, help="number of trials")
+    parser.add_argument("--population", type=int, default=100, help="individuals per archipelago")
+    parser.add_argument("--distinct", type=float, default=0.5, help="fraction of distinct best individuals")
+    parser.add_argument("--nonpolynomial", type=float, default=NONPOLYNOMIAL,
+                        help="fraction of the distinct best individuals that are not polynomials")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    build_study(args.root, args.trials, args.population, args.distinct, args.seed, args.nonpolynomial)
+
+
+if __name__ == "__main__":
+    import synthetic_study  # pickle the stand-ins as synthetic_study.*, not __main__.*
+    synthetic_study.main()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Per-stage timers of a result collection run.
+
+Every stage of a trial (loading the checkpoint summary, simplification, plotting, ...) is timed with
+StageTimer.stage and recorded with the trial it belonged to. The report lists count, total, p50, p95
+and max of each stage and the slowest trial, so the time of a run can be split between its stages.
+Profiling is opt in: cProfile collects one profile per stage and tracemalloc records the peak memory
+of each stage, both dumped to a directory at the end of the run.
+"""
+
+import cProfile
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class StageTimer:
+    """ Records the duration of every stage. Records of other processes are merged with add """
+
+    def __init__(self, profile=False, trace_memory=False):
+        """
+        :param profile: collect a cProfile profile of each stage
+        :param trace_memory: record the peak memory of each stage with tracemalloc
+        """
+        self.records = []  # [stage, label, seconds, peak bytes or None, detail]
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.profiles = {}
+        self.snapshots = {}  # stage -> (peak bytes, top allocations) of its largest peak
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name, label=None, detail=None):
+        """
+        Times the code inside the with block
+        :param name: stage, i.e. 'simplify'
+        :param label: trial the stage ran for
+        :param detail: anything that helps to find out why the stage was slow, i.e. the expression
+        """
+        profiler = None
+        if self.profile:
+            profiler = self.profiles.setdefault(name, cProfile.Profile())
+            profiler.enable()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+            peak = None
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                if peak > self.snapshots.get(name, (-1, None))[0]:
+                    top = tracemalloc.take_snapshot().statistics('lineno')[:10]
+                    self.snapshots[name] = (peak, [str(statistic) for statistic in top])
+            self.records.append([name, label, seconds, peak, detail])
+
+    def add(self, records):
+        """ Merges records, i.e. the ones a worker process returned with pop_records """
+        self.records.extend(records)
+
+    def pop_records(self):
+        """ :return: the records so far, which are removed from this timer """
+        records, self.records = self.records, []
+        return records
+
+    def summary(self):
+        """
+        :return: list of dicts per stage, in the order the stages first ran, with count, total, p50, p95, max,
+                 the peak memory, and the label and detail of the slowest record
+        """
+        rows = []
+        for name in dict.fromkeys(record[0] for record in self.records):
+            records = [record for record in self.records if record[0] == name]
+            seconds = np.array([record[2] for record in records])
+            peaks = [record[3] for record in records if record[3] is not None]
+            slowest = records[int(np.argmax(seconds))]
+            rows.append({'stage': name, 'count': len(records), 'total': float(seconds.sum()),
+                         'p50': float(np.percentile(seconds, 50)), 'p95': float(np.percentile(seconds, 95)),
+                         'max': float(seconds.max()), 'peak': max(peaks) if peaks else None,
+                         'slowest': slowest[1], 'detail': slowest[4]})
+        return rows
+
+    def report(self):
+        """ :return: the summary as a table """
+        lines = ['{0:>10} {1:>7} {2:>10} {3:>9} {4:>9} {5:>9} {6:>10}  {7}'.format(
+            'stage', 'count', 'total [s]', 'p50 [s]', 'p95 [s]', 'max [s]', 'peak [MB]', 'slowest')]
+        for row in self.summary():
+            peak = '' if row['peak'] is None else '{0:.1f}'.format(row['peak'] / 2 ** 20)
+            lines.append('{stage:>10} {count:7d} {total:10.3f} {p50:9.4f} {p95:9.4f} {max:9.4f} {0:>10}  {1}'.format(
+                peak, row['slowest'] or '', **row))
+        return '\n'.join(lines)
+
+    def dump(self, dumpDir):
+        """
+        Writes <stage>.prof (cProfile, open with pstats or snakeviz), <stage>.memory.txt (top allocations at
+        the largest peak of the stage) and the slowest records of every stage to dumpDir
+        """
+        os.makedirs(dumpDir, exist_ok=True)
+        for name, profiler in self.profiles.items():
+            profiler.dump_stats(os.path.join(dumpDir, name + '.prof'))
+        for name, (peak, top) in self.snapshots.items():
+            with open(os.path.join(dumpDir, name + '.memory.txt'), 'w') as memoryFile:
+                memoryFile.write('peak {0} bytes\n'.format(peak) + '\n'.join(top) + '\n')
+        with open(os.path.join(dumpDir, 'slowest.txt'), 'w') as slowestFile:
+            for name in dict.fromkeys(record[0] for record in self.records):
+                records = sorted((r for r in self.records if r[0] == name), key=lambda r: -r[2])[:10]
+                for stage, label, seconds, peak, detail in records:
+                    slowestFile.write('{0}\t{1:.4f}\t{2}\t{3}\n'.format(stage, seconds, label, detail or ''))
+
+
+_timer = StageTimer()
+
+
+def get_timer():
+    """ :return: the StageTimer of this process """
+    return _timer
+
+
+def configure_timer(profile=False, trace_memory=False):
+    """
+    Replaces the StageTimer of this process, i.e. to turn on profiling
+    :return: the new StageTimer
+    """
+    global _timer
+    _timer = StageTimer(profile, trace_memory)
+    return _timer
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Loads the best individual out of a trial's beam_bending_#####.pkl checkpoint exactly once and
+keeps a compact summary of it in a sidecar file next to the pickle.
+
+The sidecar is keyed on the size and mtime of the pickle, so any results_*.py script that
+runs after the first one reads the summary instead of unpickling the archipelago again.
+Summaries are best written where the checkpoint is made, at the end of the SLURM job or when
+cp_log_pkl harvests the scratch directory, so the results scripts never unpickle at all:
+    python trial_summary.py <trial directory or beam_bending_#####.pkl> ...
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+from polynomial_fit import sample_points
+from checkpoint_index import latest_checkpoint
+
+SUMMARY_SUFFIX = '.summary.json'
+SUMMARY_VERSION = 3  # bump when fields are added so that old sidecars are rebuilt
+
+# grid the best individual is evaluated on for the best_individual plots
+L = 10.
+N_POINTS = 64
+
+
+def summary_path(beamBendingPkl):
+    """
+    :param beamBendingPkl: path to a beam_bending_#####.pkl file
+    :return: path of the summary sidecar belonging to the pickle
+    """
+    return beamBendingPkl + SUMMARY_SUFFIX
+
+
+def pickle_signature(beamBendingPkl):
+    """
+    Size and modification time of a pickle. A summary is only valid for the signature it was made from.
+    :param beamBendingPkl: path to a beam_bending_#####.pkl file
+    :return: dict with the size and mtime of the file
+    """
+    stat = os.stat(beamBendingPkl)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+
+def read_summary(beamBendingPkl):
+    """
+    Reads the sidecar summary of a pickle.
+    :param beamBendingPkl: path to a beam_bending_#####.pkl file
+    :return: summary dict, or None if the sidecar is missing or was written for a different pickle
+    """
+    try:
+        with open(summary_path(beamBendingPkl)) as summaryFile:
+            summary = json.load(summaryFile)
+    except (OSError, ValueError):
+        return None
+    if summary.get('pickle') != pickle_signature(beamBendingPkl):
+        return None  # checkpoint was overwritten since the summary was made
+    if summary.get('version') != SUMMARY_VERSION:
+        return None
+    return summary
+
+
+def write_summary(beamBendingPkl, summary):
+    """
+    Writes the sidecar summary of a pickle. The file is written under a temporary name first so that
+    a half written summary is never read.
+    :param beamBendingPkl: path to a beam_bending_#####.pkl file
+    :param summary: summary dict created by summarize_archipelago
+    """
+    dst = summary_path(beamBendingPkl)
+    tmp = dst + '.tmp'
+    with open(tmp, 'w') as summaryFile:
+        json.dump(summary, summaryFile)
+    os.replace(tmp, dst)
+
+
+def load_archipelago(beamBendingPkl):
+    """
+    Unpickles a checkpoint. bingo is only imported here, so reading sidecar summaries does not need it.
+    :param beamBendingPkl: path to a beam_bending_#####.pkl file
+    :return: bingo archipelago
+    """
+    from bingo.evolutionary_optimizers.parallel_archipelago import load_parallel_archipelago_from_file
+    return load_parallel_archipelago_from_file(beamBendingPkl)
+
+
+def summarize_archipelago(archipelago):
+    """
+    Pulls everything the results scripts need out of an archipelago.
+    :param archipelago: bingo archipelago loaded from a checkpoint
+    :return: dict with the best individual, fitness, generations, complexity, constants and the
+             best individual evaluated on the plotting grid and on the polynomial fit sample points
+    """
+    best_ind = archipelago.get_best_individual()
+    x = np.linspace(0., L, N_POINTS).reshape([N_POINTS, 1])
+    y = best_ind.evaluate_equation_at(x)
+    samples = best_ind.evaluate_equation_at(sample_points().reshape([-1, 1]))
+    return {'version': SUMMARY_VERSION,
+            'best_individual': str(best_ind),
+            'fitness': float(best_ind.fitness),
+            'generations': int(archipelago.generational_age),
+            'complexity': int(best_ind.get_complexity()),
+            'constants': np.ravel(getattr(best_ind, 'constants', [])).astype(float).tolist(),
+            'curve': np.ravel(y).tolist(),
+            'samples': np.ravel(samples).tolist()}
+
+
+def load_trial_summary(beamBendingPkl):
+    """
+    Returns the summary of a trial. The pickle is only loaded if it has no valid sidecar summary yet.
+    :param beamBendingPkl: path to a beam_bending_#####.pkl file
+    :return: summary dict (see summarize_archipelago), or None if no pickle was given
+    """
+    if beamBendingPkl is None:  # handles missing .pkl file
+        return None
+
+    summary = read_summary(beamBendingPkl)
+    if summary is None:
+        signature = pickle_signature(beamBendingPkl)
+        archipelago = load_archipelago(beamBendingPkl)
+        summary = summarize_archipelago(archipelago)
+        summary['pickle'] = signature
+        write_summary(beamBendingPkl, summary)
+    return summary
+
+
+def harvest_summary(sourcePkl, destPkl):
+    """
+    Summarizes a checkpoint where it was made and writes the summary next to its copy, i.e. next to
+    the copy in the home directory of a pickle on scratch. The copy itself is never read.
+    :param sourcePkl: path to the original beam_bending_#####.pkl file
+    :param destPkl: path to the copy of the pickle
+    :return: summary dict
+    """
+    summary = read_summary(sourcePkl)
+    if summary is None:
+        summary = summarize_archipelago(load_archipelago(sourcePkl))
+    summary['pickle'] = pickle_signature(destPkl)
+    write_summary(destPkl, summary)
+    return summary
+
+
+def summary_curve(summary):
+    """
+    :param summary: summary dict
+    :return: plotting grid and the best individual evaluated on it
+    """
+    x = np.linspace(0., L, N_POINTS).reshape([N_POINTS, 1])
+    y = np.array(summary['curve'], dtype=float).reshape([N_POINTS, 1])
+    return x, y
+
+
+def main():
+    """ Writes the summary of every pickle given, or of the latest checkpoint of every trial directory given """
+    for path in sys.argv[1:]:
+        if os.path.isdir(path):
+            pkl = latest_checkpoint(os.listdir(path))
+            if pkl is None:
+                print('pkl file missing from ' + path)
+                continue
+            path = os.path.join(path, pkl)
+        summary = load_trial_summary(path)
+        print('{0}: fitness {1:.3e}, generations {2}'.format(path, summary['fitness'], summary['generations']))
+
+
+if __name__ == "__main__":
+    main()